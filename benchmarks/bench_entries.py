@@ -0,0 +1,63 @@
+"""
+Measures the per-entry overhead of turning parsed tokens into Entry
+instances, i.e. everything ``parser.parse_entry`` does after pyparsing has
+matched an entry::
+
+    python benchmarks/bench_entries.py [--number N]
+"""
+from __future__ import print_function
+
+import argparse
+import timeit
+
+from zs.bibtex import parser, structures
+
+
+FIELDS = [('author', ['Max Mustermann', 'Erika Mustermann']),
+        ('title', 'The story of my life'), ('journal', 'Life Journale'),
+        ('year', '2009'), ('volume', '1'), ('pages', '1--10')]
+
+
+def legacy_parse_entry(source, loc, tokens):
+    """
+    The way entries were created before the dispatch table was added:
+    type names lowercased twice, an ``issubclass`` check per entry and the
+    fields assigned one at a time.
+    """
+    type_ = tokens[1].lower()
+    entry_type = structures.TypeRegistry.get_type(type_)
+    if entry_type is None or not issubclass(entry_type, structures.Entry):
+        raise RuntimeError()
+    new_entry = entry_type()
+    new_entry.name = tokens[3]
+    for key, value in [t for t in tokens[4:-1] if t != ',']:
+        new_entry[key] = value
+    return new_entry
+
+
+def legacy_tokens():
+    tokens = ['@', 'Article', '{', 'mm09', ',']
+    for field in FIELDS:
+        tokens.extend([field, ','])
+    return tokens[:-1] + ['}']
+
+
+def current_tokens():
+    return ['@', 'Article', '{', 'mm09', ','] + FIELDS + ['}']
+
+
+def main():
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('--number', type=int, default=200000)
+    args = argparser.parse_args()
+    for label, function, tokens in (
+            ('before', legacy_parse_entry, legacy_tokens()),
+            ('after', parser.parse_entry, current_tokens())):
+        duration = min(timeit.repeat(lambda: function('', 0, tokens),
+            number=args.number, repeat=5))
+        print('%-8s %.3fus per entry' % (label,
+            duration / args.number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Compares parsing times of the plain grammar with the packrat-enabled one.
+
+Each mode runs in its own interpreter since packrat memoization can't be
+switched off again once it's enabled::
+
+    python benchmarks/bench_parser.py [--entries N] [--depth N]
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import subprocess
+import sys
+import timeit
+
+
+ENTRY = '''@article{name%(index)d,
+    author = {Max Mustermann and Erika Mustermann},
+    title = {%(nested)s},
+    journal = "Life Journale",
+    year = 2009,
+}
+'''
+
+
+def generate(entries, depth):
+    """
+    Generates a bibliography with ``entries`` entries, each with a title
+    nested ``depth`` levels deep.
+    """
+    nested = '{A} ' * 3
+    for _ in range(depth):
+        nested = 'x {%s} y' % nested
+    return ''.join(ENTRY % {'index': i, 'nested': nested}
+            for i in range(entries))
+
+
+def run(mode, entries, depth, repeat):
+    from zs.bibtex import parser
+    if mode == 'packrat':
+        parser.enable_packrat()
+    data = generate(entries, depth)
+    timer = timeit.Timer(lambda: parser.parse_string(data))
+    return min(timer.repeat(repeat=repeat, number=1))
+
+
+def main():
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('--entries', type=int, default=500)
+    argparser.add_argument('--depth', type=int, default=8)
+    argparser.add_argument('--repeat', type=int, default=5)
+    argparser.add_argument('--mode', choices=('plain', 'packrat'))
+    args = argparser.parse_args()
+    if args.mode:
+        print(run(args.mode, args.entries, args.depth, args.repeat))
+        return
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(sys.path)
+    for mode in ('plain', 'packrat'):
+        output = subprocess.check_output([sys.executable, __file__,
+            '--mode', mode, '--entries', str(args.entries),
+            '--depth', str(args.depth), '--repeat', str(args.repeat)],
+            env=env, universal_newlines=True)
+        print('%-8s %.4fs' % (mode, float(output)))
+
+
+if __name__ == '__main__':
+    main()
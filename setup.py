@@ -11,9 +11,13 @@ setup(
         long_description = open(join(dirname(abspath(__file__)),'README.rst')).read(),
         version='1.0.0',
         install_requires=['setuptools', 'pyparsing'],
-        namespace_packages=['zs'],
         packages=find_packages('src', exclude=['ez_setup']),
         package_dir = {'': 'src'},
+        entry_points={
+            'console_scripts': [
+                'zs-bibtex = zs.bibtex.cli:main',
+                ],
+            },
         classifiers=[
             'Programming Language :: Python :: 2.7',
             'Programming Language :: Python :: 3.4',
@@ -0,0 +1,338 @@
+"""
+The ``zs-bibtex`` command line tool. It offers the following subcommands,
+each working on one or more files (``-`` stands for stdin):
+
+validate
+    Checks the cross-references and the fields of all entries and reports
+    every problem found.
+
+convert
+    Converts the entries into JSON, JSON-lines, CSV or a pickled snapshot of
+    the Bibliography. JSON-lines and CSV are streamed entry by entry unless
+    ``--jobs`` is used. ``--fields`` selects the CSV columns.
+
+stats
+    Prints the number of entries and fields per file.
+
+dedupe
+    Lists groups of entries with identical type and fields.
+
+Files are processed in parallel if ``--jobs`` is larger than 1 and
+``--profile`` prints the phase timings to stderr once all files are done.
+"""
+from __future__ import print_function
+
+import argparse
+import gzip
+import json
+import pickle
+import sys
+
+from . import parser, exceptions, export
+from .stats import ParseStats
+
+
+STDIN = '-'
+
+
+def _load(source, encoding, stats):
+    """
+    Parses a source, which is either a ``(path, None)`` or a ``(name, text)``
+    tuple.
+    """
+    path, text = source
+    if text is not None:
+        return parser.parse_string(text, stats=stats)
+    return parser.parse_file(path, encoding=encoding, stats=stats)
+
+
+def validate_bibliography(bib, raise_unsupported=False, stats=None):
+    """
+    Validates a Bibliography like ``Bibliography.validate`` but collects all
+    problems as messages instead of stopping at the first one.
+    """
+    errors = []
+    if stats is None:
+        stats = ParseStats()
+    with stats.timer('validate'):
+        with stats.timer('check_crossrefs'):
+            try:
+                bib.check_crossrefs()
+            except exceptions.BrokenCrossReferences as e:
+                errors.extend('%s: broken cross reference to %s'
+                        % (entry.name, entry['crossref'])
+                        for entry in e.entries)
+        for entry in bib.values():
+            with stats.timer('validate_entry'):
+                try:
+                    entry.validate(raise_unsupported=raise_unsupported)
+                except exceptions.InvalidStructure as e:
+                    errors.append('%s: %s' % (entry.name, e))
+    return errors
+
+
+def _validate(bib, options, stats):
+    return validate_bibliography(bib, options['raise_unsupported'], stats)
+
+
+def _convert(bib, options, stats):
+    if options['format'] == 'snapshot':
+        return bib
+    return [export.entry_to_record(entry) for entry in bib.values()]
+
+
+def _stats(bib, options, stats):
+    entry_types = {}
+    fields = {}
+    for entry in bib.values():
+        type_ = export.entry_to_record(entry)['type']
+        entry_types[type_] = entry_types.get(type_, 0) + 1
+        for field in entry:
+            fields[field] = fields.get(field, 0) + 1
+    return {'entries': len(bib), 'entry_types': entry_types,
+            'fields': fields}
+
+
+def _dedupe(bib, options, stats):
+    return [(entry.name, entry.content_hash()) for entry in bib.values()]
+
+
+COMMANDS = {
+        'validate': _validate,
+        'convert': _convert,
+        'stats': _stats,
+        'dedupe': _dedupe,
+        }
+
+
+def _run_task(task):
+    """
+    Parses a single source and runs the command on it. This is the unit of
+    work handed to the worker processes, so it must not raise but return any
+    error as message.
+    """
+    command, source, options = task
+    stats = ParseStats() if options['profile'] else None
+    try:
+        bib = _load(source, options['encoding'], stats)
+        result = COMMANDS[command](bib, options, stats)
+    except Exception as e:
+        return source[0], None, '%s: %s' % (type(e).__name__, e), stats
+    return source[0], result, None, stats
+
+
+def run_tasks(command, sources, options, jobs=1):
+    """
+    Yields the ``(name, result, error, stats)`` tuple of each source in the
+    order of the sources, using ``jobs`` worker processes.
+    """
+    tasks = [(command, source, options) for source in sources]
+    if jobs <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield _run_task(task)
+        return
+    import multiprocessing
+    pool = multiprocessing.Pool(min(jobs, len(tasks)))
+    try:
+        for result in pool.imap(_run_task, tasks):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _sources(paths, stdin):
+    """
+    Turns the given paths into sources for ``_load``. stdin is read in the
+    main process since it can't be shared with the workers.
+    """
+    for path in paths:
+        if path == STDIN:
+            yield ('<stdin>', stdin.read())
+        else:
+            yield (path, None)
+
+
+def _print_profile(stats, file_):
+    print('%-20s %10s %10s' % ('phase', 'seconds', 'calls'), file=file_)
+    timings = stats.as_dict()['timings']
+    for phase, duration in sorted(timings.items(), key=lambda i: -i[1]):
+        print('%-20s %10.4f %10s' % (phase, duration,
+            stats.calls.get(phase, '')), file=file_)
+
+
+def _write_results(args, results, stdout, stderr):
+    """
+    Writes the results of the selected command and returns the number of
+    failed sources or problems found.
+    """
+    failures = 0
+    first = True
+    snapshot = None
+    groups = {}
+    if args.command == 'convert' and args.format == 'json':
+        stdout.write('[')
+    elif args.command == 'convert' and args.format == 'jsonl':
+        writer = export.JSONLinesWriter(stdout)
+    elif args.command == 'convert' and args.format == 'csv':
+        writer = export.CSVWriter(stdout, args.fields)
+    for name, result, error, _ in results:
+        if error is not None:
+            print('%s: %s' % (name, error), file=stderr)
+            failures += 1
+            continue
+        if args.command == 'validate':
+            for message in result:
+                print('%s: %s' % (name, message), file=stdout)
+            failures += len(result)
+        elif args.command == 'stats':
+            result['file'] = name
+            stdout.write(json.dumps(result, sort_keys=True) + '\n')
+        elif args.command == 'dedupe':
+            for entry_name, fingerprint in result:
+                groups.setdefault(fingerprint, []).append(
+                        '%s:%s' % (name, entry_name))
+        elif args.format == 'snapshot':
+            if snapshot is None:
+                snapshot = result
+            else:
+                for entry in result.values():
+                    snapshot.add(entry)
+        elif args.format == 'json':
+            for record in result:
+                line = json.dumps(record, sort_keys=True)
+                stdout.write(('\n' if first else ',\n') + line)
+                first = False
+        else:
+            for record in result:
+                writer.write(record)
+    if args.command == 'convert' and args.format == 'json':
+        stdout.write('\n]\n')
+    if snapshot is not None:
+        pickle.dump(snapshot, getattr(stdout, 'buffer', stdout), protocol=2)
+    for names in groups.values():
+        if len(names) > 1:
+            print('\t'.join(names), file=stdout)
+    return failures
+
+
+def _stream_convert(args, stdin, stdout, stderr, stats):
+    """
+    Converts the entries of all files one at a time in this process, so the
+    memory usage doesn't depend on the size of the files. Returns the number
+    of files that could not be converted completely.
+    """
+    failures = []
+
+    def entries():
+        for path in args.files:
+            name, source = ('<stdin>', stdin) if path == STDIN else (path, path)
+            try:
+                for entry in parser.iter_file(source, args.encoding,
+                        stats=stats):
+                    yield entry
+            except Exception as e:
+                print('%s: %s: %s' % (name, type(e).__name__, e), file=stderr)
+                failures.append(name)
+
+    output = stdout if args.output == STDIN else args.output
+    if args.format == 'jsonl':
+        export.write_jsonl(entries(), output)
+    else:
+        export.write_csv(entries(), output, args.fields)
+    return len(failures)
+
+
+def _csv_fields(value):
+    fields = tuple(field.strip() for field in value.split(',')
+            if field.strip())
+    if not fields:
+        raise argparse.ArgumentTypeError('no fields given')
+    return fields
+
+
+def build_argparser():
+    argparser = argparse.ArgumentParser(prog='zs-bibtex',
+            description='Validate, convert and analyse BibTeX files.')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('files', nargs='*', default=[STDIN],
+            help='BibTeX files to process (default: stdin)')
+    common.add_argument('-j', '--jobs', type=int, default=1,
+            help='number of files processed in parallel')
+    common.add_argument('--encoding', default='utf-8')
+    common.add_argument('--profile', action='store_true',
+            help='print the time spent in each phase to stderr')
+    subparsers = argparser.add_subparsers(dest='command')
+    subparsers.required = True
+    validate = subparsers.add_parser('validate', parents=[common],
+            help='check cross-references and fields')
+    validate.add_argument('--raise-unsupported', action='store_true',
+            help='also report potentially unsupported fields')
+    convert = subparsers.add_parser('convert', parents=[common],
+            help='convert entries to JSON, JSON-lines, CSV or a snapshot')
+    convert.add_argument('-f', '--format', default='jsonl',
+            choices=('json', 'jsonl', 'csv', 'snapshot'))
+    convert.add_argument('--fields', type=_csv_fields,
+            default=export.CSV_FIELDS,
+            help='comma-separated CSV columns; fields without a column are '
+            'written as JSON into the %s column if it is included '
+            '(default: %s)' % (export.OTHER_FIELDS,
+                ','.join(export.CSV_FIELDS)))
+    convert.add_argument('-o', '--output', default=STDIN,
+            help='output file, gzip-compressed if it ends with .gz '
+            '(default: stdout)')
+    subparsers.add_parser('stats', parents=[common],
+            help='print the number of entries and fields')
+    subparsers.add_parser('dedupe', parents=[common],
+            help='list entries with identical content')
+    return argparser
+
+
+def main(argv=None, stdin=None, stdout=None, stderr=None):
+    """
+    Runs the command line tool and returns its exit code.
+    """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    args = build_argparser().parse_args(argv)
+    options = {
+            'encoding': args.encoding,
+            'profile': args.profile,
+            'raise_unsupported': getattr(args, 'raise_unsupported', False),
+            'format': getattr(args, 'format', None),
+            }
+    stats = ParseStats()
+    if args.command == 'convert' and args.format in ('jsonl', 'csv') \
+            and args.jobs <= 1:
+        failures = _stream_convert(args, stdin, stdout, stderr,
+                stats if args.profile else None)
+        if args.profile:
+            _print_profile(stats, stderr)
+        return 1 if failures else 0
+    sources = list(_sources(args.files, stdin))
+
+    def results():
+        for result in run_tasks(args.command, sources, options, args.jobs):
+            if result[3] is not None:
+                stats.merge(result[3])
+            yield result
+
+    output = getattr(args, 'output', STDIN)
+    if output == STDIN:
+        failures = _write_results(args, results(), stdout, stderr)
+    elif args.format == 'snapshot':
+        open_ = gzip.open if output.endswith('.gz') else open
+        with open_(output, 'wb') as file_:
+            failures = _write_results(args, results(), file_, stderr)
+    else:
+        newline = '' if args.format == 'csv' else None
+        with export.open_output(output, newline=newline) as file_:
+            failures = _write_results(args, results(), file_, stderr)
+    if args.profile:
+        _print_profile(stats, stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""
+This module compares two versions of a bibliography and applies the found
+changes to another one. Entries are compared by their cached
+``content_hash``, so only entries that actually changed are compared field
+by field::
+
+    changes = old_bibliography.diff(new_bibliography)
+    print(changes.added, changes.removed, changes.modified)
+    target.patch(changes)
+
+Neither side has to be kept in memory completely: ``iter_changes`` streams
+the new entries against any mapping (e.g. a ``SQLiteBibliography``) and
+``iter_sorted_changes`` works on two streams of entries sorted by name.
+
+Changes are ``(kind, name, value)`` tuples with ``kind`` being one of
+``ADDED``, ``REMOVED`` or ``MODIFIED``. ``value`` is the added or removed
+entry or an ``EntryDelta`` for modified ones.
+"""
+from . import exceptions, structures
+
+
+ADDED = 'added'
+REMOVED = 'removed'
+MODIFIED = 'modified'
+
+
+def _type_name(entry):
+    return structures.TypeRegistry.get_name(type(entry)) \
+            or type(entry).__name__.lower()
+
+
+class EntryDelta(object):
+    """
+    The field-level differences between two versions of an entry.
+    """
+
+    def __init__(self, old, new):
+        self.name = new.name
+        self.old_hash = old.content_hash()
+        self.old_type = _type_name(old)
+        self.new_type = _type_name(new)
+        self.added = {}
+        self.removed = {}
+        self.changed = {}
+        for field, value in new.items():
+            if field not in old:
+                self.added[field] = value
+            elif old[field] != value:
+                self.changed[field] = (old[field], value)
+        for field, value in old.items():
+            if field not in new:
+                self.removed[field] = value
+
+    def __repr__(self):
+        return '<EntryDelta %s: +%s -%s ~%s>' % (self.name,
+                sorted(self.added), sorted(self.removed), sorted(self.changed))
+
+    def apply(self, entry):
+        """
+        Returns a new entry with the delta applied to the given one.
+        """
+        fields = dict(entry)
+        for field in self.removed:
+            fields.pop(field, None)
+        fields.update(self.added)
+        for field, (_, value) in self.changed.items():
+            fields[field] = value
+        factory = structures.TypeRegistry.get_factory(self.new_type)
+        if factory is None:
+            raise exceptions.UnsupportedEntryType(
+                    "%s is not a supported entry type" % self.new_type)
+        return factory(entry.name, fields.items())
+
+    def as_dict(self):
+        """
+        Exports the delta as plain dictionary.
+        """
+        return {
+                'name': self.name,
+                'old_type': self.old_type,
+                'new_type': self.new_type,
+                'added': self.added,
+                'removed': self.removed,
+                'changed': dict((field, list(values))
+                    for field, values in self.changed.items()),
+                }
+
+
+def _compare(name, old, new):
+    if old.content_hash() != new.content_hash():
+        return (MODIFIED, name, EntryDelta(old, new))
+    return None
+
+
+def iter_changes(old, new_entries):
+    """
+    Yields the changes between a mapping of names to entries (``old``) and
+    an iterable of entries. Apart from ``old`` only the names of the new
+    entries are kept in memory.
+    """
+    seen = set()
+    for entry in new_entries:
+        seen.add(entry.name)
+        old_entry = old.get(entry.name)
+        if old_entry is None:
+            yield (ADDED, entry.name, entry)
+        else:
+            change = _compare(entry.name, old_entry, entry)
+            if change is not None:
+                yield change
+    for name, entry in old.items():
+        if name not in seen:
+            yield (REMOVED, name, entry)
+
+
+def iter_sorted_changes(old_entries, new_entries):
+    """
+    Yields the changes between two iterables of entries that are both sorted
+    by name. Only the current entry of each side is kept in memory. A
+    ``ValueError`` is raised if either side turns out not to be sorted.
+    """
+    old_entries = _check_sorted(old_entries)
+    new_entries = _check_sorted(new_entries)
+    old = next(old_entries, None)
+    new = next(new_entries, None)
+    while old is not None or new is not None:
+        if new is None or (old is not None and old.name < new.name):
+            yield (REMOVED, old.name, old)
+            old = next(old_entries, None)
+        elif old is None or new.name < old.name:
+            yield (ADDED, new.name, new)
+            new = next(new_entries, None)
+        else:
+            change = _compare(new.name, old, new)
+            if change is not None:
+                yield change
+            old = next(old_entries, None)
+            new = next(new_entries, None)
+
+
+def _check_sorted(entries):
+    previous = None
+    for entry in entries:
+        if previous is not None and entry.name <= previous:
+            raise ValueError('Entries are not sorted by name: %s follows %s'
+                    % (entry.name, previous))
+        previous = entry.name
+        yield entry
+
+
+class BibliographyDiff(object):
+    """
+    The differences between two bibliographies as dictionaries of added and
+    removed entries and of the ``EntryDelta`` of modified ones.
+    """
+
+    def __init__(self, changes=()):
+        self.added = {}
+        self.removed = {}
+        self.modified = {}
+        targets = {ADDED: self.added, REMOVED: self.removed,
+                MODIFIED: self.modified}
+        for kind, name, value in changes:
+            targets[kind][name] = value
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + len(self.modified)
+
+    def __bool__(self):
+        return bool(len(self))
+    __nonzero__ = __bool__
+
+    def __iter__(self):
+        """
+        Yields the changes as ``(kind, name, value)`` tuples.
+        """
+        for name, entry in self.removed.items():
+            yield (REMOVED, name, entry)
+        for name, delta in self.modified.items():
+            yield (MODIFIED, name, delta)
+        for name, entry in self.added.items():
+            yield (ADDED, name, entry)
+
+
+def diff(old, new):
+    """
+    Returns the ``BibliographyDiff`` between two bibliographies.
+    """
+    return BibliographyDiff(iter_changes(old, new.values()))
+
+
+def patch(bibliography, changes, check=True):
+    """
+    Applies the given changes (a ``BibliographyDiff`` or any iterable of
+    changes) to a bibliography in place. Unless ``check`` is disabled, a
+    PatchConflict is raised if an entry to be removed or modified doesn't
+    match the state the change was created from or an entry to be added
+    already exists with different content. Changes applied before a conflict
+    was found are kept.
+    """
+    for kind, name, value in changes:
+        current = bibliography.get(name)
+        if kind == ADDED:
+            if check and current is not None \
+                    and current.content_hash() != value.content_hash():
+                raise exceptions.PatchConflict('Entry already exists', name)
+            bibliography.add(value)
+            continue
+        if current is None:
+            if check:
+                raise exceptions.PatchConflict('Entry does not exist', name)
+            continue
+        if kind == REMOVED:
+            if check and current.content_hash() != value.content_hash():
+                raise exceptions.PatchConflict('Entry was modified', name)
+            del bibliography[name]
+        else:
+            if check and current.content_hash() != value.old_hash:
+                raise exceptions.PatchConflict('Entry was modified', name)
+            bibliography.add(value.apply(current))
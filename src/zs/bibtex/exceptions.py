@@ -28,7 +28,10 @@ class InvalidStructure(RuntimeError):
     def __str__(self):
         val = super(InvalidStructure, self).__str__()
         if self.required_fields is not None and len(self.required_fields):
-            val += ' [Missing required fields: %s]' % ', '.join(self.required_fields)
+            val += ' [Missing required fields: %s]' % ', '.join(
+                    '/'.join(field) if isinstance(field, (list, tuple))
+                    else field
+                    for field in self.required_fields)
         if self.unsupported_fields is not None and len(self.unsupported_fields):
             val += ' [Unsupported fields: %s]' % ', '.join(self.unsupported_fields)
         return val
@@ -46,3 +49,36 @@ class BrokenCrossReferences(RuntimeError):
         val = super(BrokenCrossReferences, self).__str__()
         refs = ''.join(['%s => %s' % (e.name, e['crossref']) for e in self.entries])
         return val + ' [Broken references: %s]' % refs
+
+
+class PatchConflict(RuntimeError):
+    """
+    This exception is raised if a diff is applied to a bibliography whose
+    entries don't match the state the diff was created from.
+    """
+    def __init__(self, value, name):
+        super(PatchConflict, self).__init__(value)
+        self.name = name
+
+    def __str__(self):
+        val = super(PatchConflict, self).__str__()
+        return val + ' [Entry: %s]' % self.name
+
+
+class LimitExceeded(RuntimeError):
+    """
+    This exception is raised if the parser's input exceeds one of the
+    configured ``parser.Limits``. ``limit`` is the name of the exceeded
+    limit, ``value`` its configured value and ``offset`` the position within
+    the input where it was exceeded.
+    """
+    def __init__(self, value, limit, limit_value, offset):
+        super(LimitExceeded, self).__init__(value)
+        self.limit = limit
+        self.value = limit_value
+        self.offset = offset
+
+    def __str__(self):
+        val = super(LimitExceeded, self).__str__()
+        return val + ' [%s=%s at offset %d]' % (self.limit, self.value,
+                self.offset)
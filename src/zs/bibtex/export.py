@@ -0,0 +1,182 @@
+"""
+Exporters that write entries as JSON-lines or CSV records, one record per
+entry. They accept any iterable of entries, so combined with
+``parser.iter_file`` a bibliography can be exported without ever holding
+all of it in memory::
+
+    from zs.bibtex import export, parser
+
+    export.write_jsonl(parser.iter_file('huge.bib'), 'huge.jsonl.gz')
+
+Each record has the entry's ``name``, its ``type`` (the name the entry type
+is registered with in the ``TypeRegistry``) and its ``fields``. Author lists
+are kept as lists in JSON and joined with `` and `` in CSV. CSV files have a
+column per field in ``CSV_FIELDS``; the remaining fields of an entry are
+written as JSON object into the ``OTHER_FIELDS`` column.
+"""
+from __future__ import with_statement
+
+import contextlib
+import csv
+import gzip
+import io
+import json
+
+from .structures import TypeRegistry
+
+
+#: Size of the write buffer used for output files.
+BUFFER_SIZE = 256 * 1024
+
+#: CSV column holding all the fields without a column of their own.
+OTHER_FIELDS = 'other_fields'
+
+#: Columns written by ``write_csv`` by default.
+CSV_FIELDS = ('name', 'type', 'author', 'editor', 'title', 'booktitle',
+        'journal', 'publisher', 'year', OTHER_FIELDS)
+
+
+def entry_to_record(entry):
+    """
+    Returns the JSON-compatible representation of an entry.
+    """
+    type_name = TypeRegistry.get_name(type(entry))
+    if type_name is None:
+        type_name = type(entry).__name__.lower()
+    return {
+            'name': entry.name,
+            'type': type_name,
+            'fields': dict(entry),
+            }
+
+
+@contextlib.contextmanager
+def open_output(file_or_path, compress=None, newline=None):
+    """
+    Opens the given path as buffered UTF-8 text file, gzip-compressed if
+    ``compress`` is set or if it is ``None`` and the path ends with ``.gz``.
+    File objects are used as they are.
+    """
+    try:
+        is_string = isinstance(file_or_path, basestring)
+    except NameError:
+        is_string = isinstance(file_or_path, str)
+    if not is_string:
+        yield file_or_path
+        return
+    if compress is None:
+        compress = file_or_path.endswith('.gz')
+    if compress:
+        raw = io.BufferedWriter(gzip.GzipFile(file_or_path, 'wb'),
+                BUFFER_SIZE)
+    else:
+        raw = io.open(file_or_path, 'wb', buffering=BUFFER_SIZE)
+    with io.TextIOWrapper(raw, encoding='utf-8', newline=newline) as file_:
+        yield file_
+
+
+class JSONLinesWriter(object):
+    """
+    Writes records as one JSON object per line.
+    """
+
+    def __init__(self, file_):
+        self.file = file_
+
+    def write(self, record):
+        line = json.dumps(record, sort_keys=True)
+        if isinstance(line, bytes):
+            # Python 2 returns (ASCII-only) bytes.
+            line = line.decode('ascii')
+        self.file.write(line + '\n')
+
+
+class _UnicodeCSVWriter(object):
+    """
+    A ``csv.writer`` for text files on Python 2, whose csv module only
+    handles bytes. Each row is encoded as UTF-8, formatted into a buffer and
+    written to the file as text.
+    """
+
+    def __init__(self, file_):
+        self.file = file_
+        self.buffer = io.BytesIO()
+        self.writer = csv.writer(self.buffer)
+
+    def writerow(self, row):
+        self.writer.writerow([value if isinstance(value, bytes)
+            else value.encode('utf-8') for value in row])
+        self.file.write(self.buffer.getvalue().decode('utf-8'))
+        self.buffer.seek(0)
+        self.buffer.truncate()
+
+
+if bytes is str:
+    _csv_writer = _UnicodeCSVWriter
+else:
+    _csv_writer = csv.writer
+
+
+class CSVWriter(object):
+    """
+    Writes records as CSV rows with the given columns. ``name`` and ``type``
+    are taken from the record, all other columns from its fields. If the
+    columns include ``OTHER_FIELDS``, the fields without a column are written
+    into it as JSON object, otherwise they are left out. The header row is
+    written right away.
+    """
+
+    def __init__(self, file_, fields=CSV_FIELDS):
+        self.fields = fields
+        self.writer = _csv_writer(file_)
+        self.writer.writerow(fields)
+
+    def write(self, record):
+        row = []
+        for field in self.fields:
+            if field in ('name', 'type'):
+                value = record[field]
+            elif field == OTHER_FIELDS:
+                value = self._other_fields(record)
+            else:
+                value = record['fields'].get(field, '')
+            if isinstance(value, list):
+                value = ' and '.join(value)
+            row.append(value)
+        self.writer.writerow(row)
+
+    def _other_fields(self, record):
+        other = dict((key, value) for key, value in record['fields'].items()
+                if key not in self.fields)
+        if not other:
+            return ''
+        return json.dumps(other, sort_keys=True)
+
+
+def write_jsonl(entries, file_or_path, compress=None):
+    """
+    Writes the given entries as JSON-lines into a path or text file object
+    and returns the number of written entries.
+    """
+    count = 0
+    with open_output(file_or_path, compress) as file_:
+        writer = JSONLinesWriter(file_)
+        for entry in entries:
+            writer.write(entry_to_record(entry))
+            count += 1
+    return count
+
+
+def write_csv(entries, file_or_path, fields=CSV_FIELDS, compress=None):
+    """
+    Writes the given entries as CSV into a path or text file object and
+    returns the number of written entries. ``fields`` are the columns of the
+    CSV file (see ``CSVWriter``).
+    """
+    count = 0
+    with open_output(file_or_path, compress, newline='') as file_:
+        writer = CSVWriter(file_, fields)
+        for entry in entries:
+            writer.write(entry_to_record(entry))
+            count += 1
+    return count
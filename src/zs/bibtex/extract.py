@@ -0,0 +1,233 @@
+"""
+This module extracts the entries cited by a document from a (potentially
+huge) BibTeX file without parsing all of it::
+
+    keys = extract.read_aux_citations('paper.aux')
+    bib = extract.extract('shared.bib', keys)
+
+The file is only scanned for the start and end of each entry, which is a
+lot faster than running the grammar over it. Only the requested entries and
+the entries they cross-reference (transitively) are actually parsed. Keys
+that can't be found are skipped, use ``Bibliography.check_crossrefs`` or
+compare the keys of the result to find them.
+
+The scan results in an index of the byte offsets of all entries. With
+``cache=True`` it is stored next to the BibTeX file (see ``load_index``) and
+reused as long as the file isn't modified.
+"""
+from __future__ import with_statement
+
+import codecs
+import json
+import os
+import re
+
+from . import parser, structures
+
+
+#: Appended to the path of a BibTeX file to get the path of its cached index.
+INDEX_SUFFIX = '.idx'
+
+#: Version of the cached index format, older caches are rebuilt.
+INDEX_VERSION = 1
+
+#: The citation key requesting all entries (``\nocite{*}``).
+ALL = '*'
+
+_HEADER = re.compile(br'@\s*[a-zA-Z0-9-_:/]+\s*\{\s*([a-zA-Z0-9-_:/]+)')
+_AUX_CITATION = re.compile(r'\\citation\{([^}]*)\}')
+_AUX_INPUT = re.compile(r'\\@input\{([^}]*)\}')
+
+
+class _StaleIndex(Exception):
+    pass
+
+
+def _is_path(file_or_path):
+    try:
+        return isinstance(file_or_path, basestring)
+    except NameError:
+        return isinstance(file_or_path, str)
+
+
+def _entry_key(text):
+    match = _HEADER.match(text)
+    if match is None:
+        return None
+    return match.group(1).decode('ascii')
+
+
+def read_aux_citations(file_or_path, encoding='utf-8'):
+    """
+    Returns the set of citation keys found in the ``\\citation`` commands of
+    a LaTeX .aux file. For paths, the .aux files of included documents
+    (``\\@input``) are read as well. Like LaTeX does, their paths are
+    relative to the directory of the main .aux file and missing ones are
+    skipped.
+    """
+    keys = set()
+
+    def add_citations(text):
+        for citation in _AUX_CITATION.findall(text):
+            keys.update(key.strip() for key in citation.split(',')
+                    if key.strip())
+    if not _is_path(file_or_path):
+        add_citations(file_or_path.read())
+        return keys
+    directory = os.path.dirname(os.path.abspath(file_or_path))
+    pending = [os.path.abspath(file_or_path)]
+    seen = set()
+    while pending:
+        path = os.path.join(directory, pending.pop())
+        if path in seen or not os.path.exists(path):
+            continue
+        seen.add(path)
+        with codecs.open(path, 'r', encoding) as file_:
+            text = file_.read()
+        add_citations(text)
+        pending.extend(name.strip() for name in _AUX_INPUT.findall(text))
+    return keys
+
+
+def build_index(file_or_path, limits=None):
+    """
+    Scans a BibTeX file (a path or a binary file object) and returns a
+    dictionary mapping the key of each entry to its byte offset and length.
+    """
+    if _is_path(file_or_path):
+        with open(file_or_path, 'rb') as file_:
+            return build_index(file_, limits)
+    index = {}
+    splitter = parser._EntrySplitter(parser._read_chunks(file_or_path),
+            limits or parser.NO_LIMITS)
+    for offset, text in splitter:
+        key = _entry_key(text)
+        if key is not None:
+            index[key] = (offset, len(text))
+    return index
+
+
+def _file_state(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime]
+
+
+def load_index(path, index_path=None, limits=None, rebuild=False):
+    """
+    Returns the index of the BibTeX file at ``path`` (see ``build_index``).
+    It is read from ``index_path`` (defaulting to the path of the BibTeX file
+    with ``INDEX_SUFFIX`` appended) if the size and modification time of the
+    file still match. Otherwise (or with ``rebuild``) it is built and stored
+    there. If the index can't be stored (e.g. next to a shared, read-only
+    bibliography), it is just returned.
+    """
+    if index_path is None:
+        index_path = path + INDEX_SUFFIX
+    state = _file_state(path)
+    if not rebuild:
+        try:
+            with open(index_path) as file_:
+                cached = json.load(file_)
+        except (IOError, OSError, ValueError):
+            cached = None
+        if cached is not None and cached.get('version') == INDEX_VERSION \
+                and cached.get('file') == state:
+            return dict((key, tuple(value))
+                    for key, value in cached['entries'].items())
+    index = build_index(path, limits)
+    temp_path = '%s.%d.tmp' % (index_path, os.getpid())
+    try:
+        with open(temp_path, 'w') as file_:
+            json.dump({'version': INDEX_VERSION, 'file': state,
+                'entries': index}, file_)
+        getattr(os, 'replace', os.rename)(temp_path, index_path)
+    except (IOError, OSError):
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+    return index
+
+
+def _read_entry(file_, key, position, encoding, stats, limits):
+    offset, length = position
+    file_.seek(offset)
+    text = file_.read(length)
+    if _entry_key(text) != key:
+        raise _StaleIndex(key)
+    return parser._parse(text.decode(encoding), stats, 'single_entry', limits)
+
+
+def _extract(file_, keys, index, encoding, stats, limits):
+    entries = {}
+    if ALL in keys:
+        pending = list(index)
+    else:
+        pending = [key for key in keys if key in index]
+    while pending:
+        key = pending.pop()
+        if key in entries:
+            continue
+        entry = _read_entry(file_, key, index[key], encoding, stats, limits)
+        entries[key] = entry
+        crossref = entry.get('crossref')
+        if crossref is not None and crossref in index \
+                and crossref not in entries:
+            pending.append(crossref)
+    bib = structures.Bibliography()
+    for key in sorted(entries, key=lambda key: index[key][0]):
+        bib.add(entries[key])
+    return bib
+
+
+def _index(file_, cache_path, limits, rebuild=False):
+    if cache_path is not None:
+        return load_index(cache_path, limits=limits, rebuild=rebuild)
+    file_.seek(0)
+    return build_index(file_, limits)
+
+
+def _extract_file(file_, cache_path, keys, index, encoding, stats, limits):
+    if index is None:
+        if stats is None:
+            index = _index(file_, cache_path, limits)
+        else:
+            with stats.timer('index'):
+                index = _index(file_, cache_path, limits)
+    try:
+        return _extract(file_, keys, index, encoding, stats, limits)
+    except _StaleIndex:
+        # The file was changed without changing its size and modification
+        # time (or an index of another file was passed in).
+        index = _index(file_, cache_path, limits, rebuild=True)
+        return _extract(file_, keys, index, encoding, stats, limits)
+
+
+def extract(file_or_path, keys, encoding='utf-8', index=None, cache=False,
+        stats=None, limits=None):
+    """
+    Returns a Bibliography with the entries of the given keys and their
+    cross-referenced entries from a BibTeX file (a path or a seekable binary
+    file object). The entries are added in the order of the file. ``keys``
+    may include ``ALL`` to extract every entry.
+
+    A previously built ``index`` of the file can be passed in. For paths,
+    ``cache`` enables the index cached by ``load_index``. ``stats`` and
+    ``limits`` work the same way as for ``parser.parse_string``.
+    """
+    keys = set(keys)
+    if not _is_path(file_or_path):
+        return _extract_file(file_or_path, None, keys, index, encoding, stats,
+                limits)
+    with open(file_or_path, 'rb') as file_:
+        return _extract_file(file_, file_or_path if cache else None, keys,
+                index, encoding, stats, limits)
+
+
+def extract_aux(aux_path, bib_path, encoding='utf-8', **kwargs):
+    """
+    Returns the Bibliography of the entries cited in the given .aux file.
+    The remaining arguments are passed to ``extract``.
+    """
+    return extract(bib_path, read_aux_citations(aux_path, encoding),
+            encoding, **kwargs)
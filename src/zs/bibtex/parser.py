@@ -7,10 +7,13 @@ from __future__ import with_statement
 
 import string
 import re
+import sys
 import codecs
-import pyparsing as pp
+import threading
+import warnings
 
 from . import structures, exceptions
+from .stats import timer
 
 
 def normalize_value(text):
@@ -24,14 +27,68 @@ def normalize_value(text):
 ###############################################################################
 # Actions
 
+class Limits(object):
+    """
+    Limits for the input accepted by the parser. Input exceeding one of them
+    is rejected with a LimitExceeded exception as soon as it is noticed.
+    ``None`` disables a limit.
+
+    ``max_depth``
+        Maximum nesting depth of braces within a field value; ``{a}`` has a
+        depth of 1.
+    ``max_field_size``
+        Maximum number of characters of a field value.
+    ``max_entry_size``
+        Maximum number of characters of an entry, from its ``@`` up to its
+        closing brace.
+    """
+
+    def __init__(self, max_depth=None, max_field_size=None,
+            max_entry_size=None):
+        self.max_depth = max_depth
+        self.max_field_size = max_field_size
+        self.max_entry_size = max_entry_size
+
+
+#: No limits at all.
+NO_LIMITS = Limits()
+
+
+class _ParserState(threading.local):
+    """
+    Per-thread state of the currently running parse. ``stats`` is the
+    ``ParseStats`` instance and ``limits`` the ``Limits`` instance passed to
+    the parse function.
+    """
+    stats = None
+    limits = NO_LIMITS
+
+_state = _ParserState()
+
+
 def parse_field(source, loc, tokens):
     """
     Returns the tokens of a field as key-value pair.
     """
+    stats = _state.stats
+    if stats is not None:
+        start = timer()
     name = tokens[0].lower()
-    value = normalize_value(tokens[2])
+    max_field_size = _state.limits.max_field_size
+    if max_field_size is not None and len(tokens[2]) > max_field_size:
+        raise exceptions.LimitExceeded('Field %s is too large' % name,
+                'max_field_size', max_field_size, loc)
+    if stats is None:
+        value = normalize_value(tokens[2])
+    else:
+        with stats.timer('normalize_value'):
+            value = normalize_value(tokens[2])
     if name == 'author' and ' and ' in value:
         value = [field.strip() for field in value.split(' and ')]
+    if stats is not None:
+        duration = timer() - start
+        stats.add_timing('parse_field', duration)
+        stats.record_field(name, loc, duration)
     return (name, value)
 
 def parse_entry(source, loc, tokens):
@@ -39,25 +96,50 @@ def parse_entry(source, loc, tokens):
     Converts the tokens of an entry into an Entry instance. If no applicable
     type is available, an UnsupportedEntryType exception is raised.
     """
-    type_ = tokens[1].lower()
-    entry_type = structures.TypeRegistry.get_type(type_)
-    if entry_type is None or not issubclass(entry_type, structures.Entry):
+    stats = _state.stats
+    if stats is not None:
+        start = timer()
+    if stats is None:
+        factory = structures.TypeRegistry.get_factory(tokens[1])
+    else:
+        with stats.timer('type_lookup'):
+            factory = structures.TypeRegistry.get_factory(tokens[1])
+    if factory is None:
         raise exceptions.UnsupportedEntryType(
-                "%s is not a supported entry type" % type_
+                "%s is not a supported entry type" % tokens[1].lower()
             )
-    new_entry = entry_type()
-    new_entry.name = tokens[3]
-    for key, value in [t for t in tokens[4:-1] if t != ',']:
-        new_entry[key] = value
+    new_entry = factory(tokens[3], tokens[5:-1])
+    if stats is not None:
+        stats.add_timing('parse_entry', timer() - start)
+        stats.record_entry(new_entry, _entry_size(new_entry))
     return new_entry
 
+def _entry_size(entry):
+    """
+    Returns the number of characters within the field names and values of an
+    entry.
+    """
+    size = 0
+    for key, value in entry.items():
+        size += len(key)
+        if isinstance(value, list):
+            size += sum(len(v) for v in value)
+        else:
+            size += len(value)
+    return size
+
 def parse_bibliography(source, loc, tokens):
     """
     Combines the parsed entries into a Bibliography instance.
     """
+    stats = _state.stats
+    if stats is not None:
+        start = timer()
     bib = structures.Bibliography()
     for entry in tokens:
         bib.add(entry)
+    if stats is not None:
+        stats.add_timing('parse_bibliography', timer() - start)
     return bib
 
 def parse_bstring(source, loc, tokens):
@@ -69,54 +151,496 @@ def parse_bstring(source, loc, tokens):
 ###############################################################################
 # Grammar
 
-comment = pp.Literal('%') + pp.SkipTo(pp.LineEnd(), include=True)
-bstring_nested = pp.Forward()
-bstring_nested << '{' + pp.ZeroOrMore(bstring_nested | pp.Regex('[^{}]+')) + '}'
-bstring = pp.Suppress('{') + pp.ZeroOrMore(pp.Or([bstring_nested, pp.Regex('[^{}]+')])).leaveWhitespace() + pp.Suppress('}')
-bstring.setParseAction(parse_bstring)
+# The grammar is only built (and pyparsing only imported) the first time it
+# is needed. This keeps ``import zs.bibtex.parser`` cheap for short-lived
+# processes. The individual elements are still reachable as module
+# attributes (e.g. ``parser.bstring``) through ``__getattr__`` below, or
+# through ``_LazyElement`` proxies on Python versions before 3.7.
+
+GRAMMAR_ELEMENTS = ('comment', 'bstring', 'label', 'field_value', 'field',
+        'entry_content', 'entry', 'bibliography', 'pattern', 'single_entry')
+
+#: Elements that are no longer part of the grammar. They are only built on
+#: access, which issues a DeprecationWarning.
+DEPRECATED_ELEMENTS = ('bstring_nested',)
+
+#: Default number of entries kept in the packrat cache.
+DEFAULT_PACKRAT_CACHE_SIZE = 1024
+
+_grammar = None
+_grammar_lock = threading.Lock()
+
+
+def _build_grammar():
+    """
+    Constructs all the grammar elements and returns them as dictionary.
+    """
+    import pyparsing as pp
+
+    comment = pp.Literal('%') + pp.SkipTo(pp.LineEnd(), include=True)
+    bstring = _brace_string_type(pp)().setName("bstring")
+    bstring.setParseAction(parse_bstring)
+
+    label = pp.Regex(r'[a-zA-Z0-9-_:/]+')
+    # All alternatives start with a different character, so the first match
+    # is also the only possible one and there is no need for ``pp.Or`` to
+    # try them all.
+    field_value = pp.MatchFirst([
+            bstring,
+            pp.Regex(r'[0-9]+'),
+            pp.QuotedString(quoteChar='"', multiline=True, escChar='\\'),
+            pp.QuotedString(quoteChar="'", multiline=True, escChar='\\')
+            ])
+
+    field = (label + '=' + field_value).setName("field")
+    field.setParseAction(parse_field)
+
+    entry_content = field + pp.ZeroOrMore(pp.Suppress(',') + field) \
+            + pp.Optional(pp.Suppress(','))
+
+    entry = ('@' + label + "{" + label + "," + entry_content + "}").setName("entry")
+    entry.setParseAction(parse_entry)
+
+    bibliography = (pp.OneOrMore(entry)).setName("bibliography")
+    bibliography.setParseAction(parse_bibliography)
+
+    # Both patterns share the same ignore expression, so the elements they
+    # have in common don't end up checking for comments twice.
+    ignored_comment = pp.Suppress(comment)
+    pattern = bibliography + pp.StringEnd()
+    pattern.ignore(ignored_comment)
+
+    single_entry = entry + pp.StringEnd()
+    single_entry.ignore(ignored_comment)
+
+    elements = locals()
+    return dict((name, elements[name]) for name in GRAMMAR_ELEMENTS)
+
+
+_BRACES = re.compile('[{}]')
+
+# What the recursive grammar formerly used for nested braces skipped at the
+# start of each token: comments everywhere, whitespace only within nested
+# braces.
+_SKIPPED_COMMENTS = re.compile(r'(?:[ \t\r\n]*%[^\n]*\n?)*')
+_SKIPPED = re.compile(r'(?:[ \t\r\n]|%[^\n]*\n?)*')
+
+
+def _brace_string_type(pp):
+    """
+    Returns the pyparsing token class for values in braces. It is created
+    on demand so that pyparsing is only imported along with the grammar.
+    """
+
+    class BraceString(pp.Token):
+        """
+        Matches a value in (possibly nested) braces and returns its content
+        without the outer braces. Nesting is tracked with a counter instead
+        of recursion, so the depth is only bounded by ``Limits.max_depth``.
+
+        Like the recursive grammar it replaces, it drops comments following
+        a brace and, within nested braces, whitespace following a brace
+        (``{Hello { World}}`` results in ``Hello {World}``).
+        """
+
+        def __init__(self):
+            super(BraceString, self).__init__()
+            self.errmsg = 'Expected "{"'
+            self.mayIndexError = False
+
+        def parseImpl(self, instring, loc, doActions=True):
+            if not instring.startswith('{', loc):
+                raise pp.ParseException(instring, loc, self.errmsg, self)
+            limits = _state.limits
+            max_depth = limits.max_depth
+            depth = 0
+            pieces = []
+            start = loc + 1
+            pos = loc
+            while True:
+                match = _BRACES.search(instring, pos)
+                if match is None:
+                    raise pp.ParseException(instring, loc, 'Unterminated "{"',
+                            self)
+                pos = match.end()
+                if match.group() == '{':
+                    depth += 1
+                    if max_depth is not None and depth > max_depth:
+                        raise exceptions.LimitExceeded(
+                                'Braces are nested too deeply', 'max_depth',
+                                max_depth, match.start())
+                else:
+                    depth -= 1
+                    if not depth:
+                        if limits.max_field_size is not None \
+                                and pos - loc - 2 > limits.max_field_size:
+                            raise exceptions.LimitExceeded(
+                                    'Field value is too large',
+                                    'max_field_size', limits.max_field_size,
+                                    loc)
+                        pieces.append(instring[start:pos - 1])
+                        return pos, ''.join(pieces)
+                skipped = (_SKIPPED if depth > 1 else _SKIPPED_COMMENTS) \
+                        .match(instring, pos).end()
+                if skipped > pos:
+                    pieces.append(instring[start:pos])
+                    start = pos = skipped
+
+    return BraceString
+
+
+def get_grammar():
+    """
+    Returns a dictionary of all the grammar elements, building them on the
+    first call.
+    """
+    global _grammar
+    if _grammar is None:
+        with _grammar_lock:
+            if _grammar is None:
+                _grammar = _build_grammar()
+    return _grammar
+
+
+def enable_packrat(cache_size_limit=DEFAULT_PACKRAT_CACHE_SIZE):
+    """
+    Enables pyparsing's packrat memoization with a bounded cache. This mostly
+    pays off for inputs with deeply nested braces where the same positions
+    are tried over and over again.
+
+    Note that this switches on memoization for *all* pyparsing grammars
+    within the current process. The cache is cleared after every parsed
+    document so that it doesn't keep growing in long-running processes.
+    Older pyparsing versions don't support a size limit; their cache is
+    only bounded by the size of the document.
+    """
+    import pyparsing as pp
+    try:
+        pp.ParserElement.enablePackrat(cache_size_limit)
+    except TypeError:
+        pp.ParserElement.enablePackrat()
+
+
+def _reset_cache():
+    """
+    Drops everything memoized while parsing the last document.
+    """
+    import pyparsing as pp
+    getattr(pp.ParserElement, 'reset_cache', pp.ParserElement.resetCache)()
+
+
+_deprecated_elements = {}
+
+
+def _build_bstring_nested():
+    """
+    The recursive element formerly used for nested braces, which runs into
+    Python's recursion limit for deeply nested values.
+    """
+    import pyparsing as pp
+    bstring_nested = pp.Forward()
+    bstring_nested << '{' + pp.ZeroOrMore(bstring_nested | pp.Regex('[^{}]+')) + '}'
+    return bstring_nested
+
+
+def _get_element(name):
+    if name in DEPRECATED_ELEMENTS:
+        warnings.warn('%s is no longer part of the grammar and will be '
+                'removed' % name, DeprecationWarning, stacklevel=3)
+        element = _deprecated_elements.get(name)
+        if element is None:
+            element = _deprecated_elements.setdefault(name,
+                    globals()['_build_' + name]())
+        return element
+    return get_grammar()[name]
+
 
-label = pp.Regex(r'[a-zA-Z0-9-_:/]+')
-field_value = pp.Or([
-        bstring,
-        pp.Regex(r'[0-9]+'),
-        pp.QuotedString(quoteChar='"', multiline=True, escChar='\\'),
-        pp.QuotedString(quoteChar="'", multiline=True, escChar='\\')
-        ])
+def __getattr__(name):
+    if name in GRAMMAR_ELEMENTS or name in DEPRECATED_ELEMENTS:
+        return _get_element(name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+class _LazyElement(object):
+    """
+    Stands in for a grammar element on Python versions without support for
+    a module level ``__getattr__``. Attribute access and the pyparsing
+    operators are passed on to the actual element, building the grammar on
+    first use.
+    """
+    __slots__ = ('_name',)
 
-field = (label + '=' + field_value).setName("field")
-field.setParseAction(parse_field)
+    def __init__(self, name):
+        self._name = name
 
-entry_content = field + pp.ZeroOrMore(',' + field) + pp.Optional(',')
+    def _element(self):
+        return _get_element(self._name)
 
-entry = ('@' + label + "{" + label + "," + entry_content + "}").setName("entry")
-entry.setParseAction(parse_entry)
+    def __getattr__(self, attr):
+        return getattr(self._element(), attr)
 
-bibliography = (pp.OneOrMore(entry)).setName("bibliography")
-bibliography.setParseAction(parse_bibliography)
+    def __repr__(self):
+        return repr(self._element())
 
-pattern = bibliography + pp.StringEnd()
-pattern.ignore(comment)
+    def __str__(self):
+        return str(self._element())
+
+
+def _delegate(method_name):
+    def method(self, *args):
+        args = [arg._element() if isinstance(arg, _LazyElement) else arg
+                for arg in args]
+        return getattr(self._element(), method_name)(*args)
+    method.__name__ = method_name
+    return method
+
+for _method_name in ('__add__', '__radd__', '__sub__', '__rsub__', '__mul__',
+        '__rmul__', '__or__', '__ror__', '__xor__', '__rxor__', '__and__',
+        '__rand__', '__invert__', '__call__', '__lshift__'):
+    setattr(_LazyElement, _method_name, _delegate(_method_name))
+
+if sys.version_info < (3, 7):
+    for _name in GRAMMAR_ELEMENTS + DEPRECATED_ELEMENTS:
+        globals()[_name] = _LazyElement(_name)
+
+###############################################################################
+# Entry splitting
+
+#: Number of characters read at once when streaming entries from a file.
+CHUNK_SIZE = 64 * 1024
+
+
+class _SplitTokens(object):
+    """
+    The patterns and characters the entry splitter is looking for, either as
+    text or as bytes.
+    """
+
+    def __init__(self, type_):
+        if type_ is bytes and bytes is not str:
+            convert = lambda value: value.encode('ascii')
+        else:
+            convert = lambda value: value
+        compile_ = lambda pattern: re.compile(convert(pattern), re.DOTALL)
+        self.outside = compile_(r'\S')
+        self.header = compile_(r'[{]')
+        self.fields = compile_(r'[{}"\'%]')
+        self.braces = compile_(r'[{}]')
+        self.newline = compile_(r'\n')
+        self.quoted = {
+                convert('"'): compile_(r'\\.|"'),
+                convert("'"): compile_(r"\\.|'"),
+                }
+        self.at = convert('@')
+        self.percent = convert('%')
+        self.open = convert('{')
+        self.close = convert('}')
+
+
+class _EntrySplitter(object):
+    """
+    Splits a stream of text (or bytes) chunks into the raw text of the
+    individual entries without parsing them. Only the current entry and
+    chunk are kept in memory.
+
+    Outside of entries only whitespace and comments are allowed. Within an
+    entry, braces are counted to find its end; quoted values and comments
+    between the fields are skipped.
+    """
+
+    def __init__(self, chunks, limits=NO_LIMITS):
+        self.chunks = iter(chunks)
+        self.limits = limits
+        self.buf = None
+        self.base = 0
+        self.entry_end = None
+
+    def _more(self, keep):
+        """
+        Reads the next chunk, dropping everything in front of the absolute
+        position ``keep``. Returns ``False`` once the input is exhausted.
+        """
+        for chunk in self.chunks:
+            if chunk:
+                self.buf = self.buf[keep - self.base:] + chunk
+                self.base = keep
+                return True
+        return False
+
+    def _find(self, pattern, pos, keep):
+        """
+        Searches for ``pattern`` starting at the absolute position ``pos``,
+        reading more chunks as needed. Returns the match and its absolute
+        end position or ``(None, None)`` at the end of the input.
+        """
+        while True:
+            match = pattern.search(self.buf, pos - self.base)
+            if match is not None:
+                return match, match.end() + self.base
+            # Patterns match at most two characters, so the last one has to
+            # be searched again together with the next chunk.
+            pos = max(pos, self.base + len(self.buf) - 1)
+            if self.entry_end is not None and pos > self.entry_end:
+                self._entry_too_large()
+            if not self._more(min(keep, pos)):
+                return None, None
+
+    def _entry_too_large(self):
+        max_entry_size = self.limits.max_entry_size
+        raise exceptions.LimitExceeded('Entry is too large', 'max_entry_size',
+                max_entry_size, self.entry_end - max_entry_size)
+
+    def _error(self, message, pos):
+        import pyparsing as pp
+        raise pp.ParseException(self.buf, pos - self.base,
+                '%s (at offset %d)' % (message, pos))
+
+    def __iter__(self):
+        """
+        Yields a ``(offset, text)`` tuple for each entry.
+        """
+        for chunk in self.chunks:
+            if chunk:
+                self.buf = chunk
+                break
+        else:
+            return
+        tokens = _SplitTokens(type(self.buf))
+        pos = 0
+        while True:
+            match, pos = self._find(tokens.outside, pos, pos)
+            if match is None:
+                return
+            char = match.group()
+            if char == tokens.percent:
+                match, pos = self._find(tokens.newline, pos, pos)
+                if match is None:
+                    return
+            elif char == tokens.at:
+                start = pos - 1
+                pos = self._scan_entry(tokens, start)
+                yield start, self.buf[start - self.base:pos - self.base]
+            else:
+                self._error('Expected "@" or a comment', pos - 1)
+
+    def _scan_entry(self, tokens, start):
+        """
+        Returns the absolute end position of the entry starting at
+        ``start``.
+        """
+        max_depth = self.limits.max_depth
+        if self.limits.max_entry_size is not None:
+            self.entry_end = start + self.limits.max_entry_size
+        match, pos = self._find(tokens.header, start + 1, start)
+        depth = 1
+        while match is not None and depth:
+            if depth == 1:
+                match, pos = self._find(tokens.fields, pos, start)
+            else:
+                match, pos = self._find(tokens.braces, pos, start)
+            if match is None:
+                break
+            char = match.group()
+            if char == tokens.open:
+                depth += 1
+                # The entry's own braces don't count as nesting.
+                if max_depth is not None and depth - 1 > max_depth:
+                    raise exceptions.LimitExceeded(
+                            'Braces are nested too deeply', 'max_depth',
+                            max_depth, pos - 1)
+            elif char == tokens.close:
+                depth -= 1
+            elif char == tokens.percent:
+                match, pos = self._find(tokens.newline, pos, start)
+            else:
+                quoted = tokens.quoted[char]
+                match, pos = self._find(quoted, pos, start)
+                while match is not None and match.group() != char:
+                    match, pos = self._find(quoted, pos, start)
+        if match is None:
+            self._error('Unterminated entry', start)
+        if self.entry_end is not None:
+            if pos > self.entry_end:
+                self._entry_too_large()
+            self.entry_end = None
+        return pos
+
+
+def _read_chunks(file_):
+    """
+    Yields the content of a file object in chunks of ``CHUNK_SIZE``.
+    """
+    while True:
+        chunk = file_.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
 
 ###############################################################################
 # Helper functions
 
-def parse_string(str_, validate=False):
+def _parse(text, stats=None, element='pattern', limits=None):
+    """
+    Runs the grammar (or the given element of it) over the given text and
+    returns the resulting Bibliography (or Entry) instance.
+    """
+    pattern = get_grammar()[element]
+    if limits is not None:
+        _state.limits = limits
+    if stats is None:
+        try:
+            return pattern.parseString(text)[0]
+        finally:
+            _state.limits = NO_LIMITS
+            _reset_cache()
+    stats.chars_processed += len(text)
+    _state.stats = stats
+    try:
+        with stats.timer('parse'):
+            return pattern.parseString(text)[0]
+    finally:
+        _state.stats = None
+        _state.limits = NO_LIMITS
+        _reset_cache()
+
+
+def _check_limits(text, limits):
+    """
+    Checks the nesting depth and entry sizes of a whole document before it
+    is handed to the grammar. This only counts braces and is a lot faster
+    than the actual parsing.
+    """
+    if limits is not None and (limits.max_depth is not None
+            or limits.max_entry_size is not None):
+        for _ in _EntrySplitter([text], limits):
+            pass
+
+
+def parse_string(str_, validate=False, stats=None, limits=None):
     """
     Tries to parse a given string into a Bibliography instance. If ``validate``
     is passed as keyword argument and set to ``True``, the Bibliography
     will be validated using the standard rules.
+
+    If a ``zs.bibtex.stats.ParseStats`` instance is passed as ``stats``, the
+    timings and counters of this run are recorded in it. ``limits`` can be
+    a ``Limits`` instance restricting the accepted input.
     """
-    result = pattern.parseString(str_)[0]
+    _check_limits(str_, limits)
+    result = _parse(str_, stats, limits=limits)
     if validate:
-        result.validate()
+        result.validate(stats=stats)
     return result
 
 
-def parse_file(file_or_path, encoding='utf-8', validate=False):
+def parse_file(file_or_path, encoding='utf-8', validate=False, stats=None,
+        limits=None):
     """
     Tries to parse a given filepath or fileobj into a Bibliography instance. If
     ``validate`` is passed as keyword argument and set to ``True``, the
     Bibliography will be validated using the standard rules.
+
+    ``stats`` and ``limits`` work the same way as for ``parse_string``.
     """
     try:
         is_string = isinstance(file_or_path, basestring)
@@ -124,9 +648,46 @@ def parse_file(file_or_path, encoding='utf-8', validate=False):
         is_string = isinstance(file_or_path, str)
     if is_string:
         with codecs.open(file_or_path, 'r', encoding) as file_:
-            result = pattern.parseFile(file_)[0]
+            text = file_.read()
     else:
-        result = pattern.parseFile(file_or_path)[0]
+        text = file_or_path.read()
+    _check_limits(text, limits)
+    result = _parse(text, stats, limits=limits)
     if validate:
-        result.validate()
+        result.validate(stats=stats)
     return result
+
+
+def _iter_entries(chunks, stats=None, limits=None):
+    for offset, text in _EntrySplitter(chunks, limits or NO_LIMITS):
+        yield _parse(text, stats, 'single_entry', limits)
+
+
+def iter_string(str_, stats=None, limits=None):
+    """
+    Yields the Entry instances within the given string one at a time instead
+    of building a whole Bibliography.
+    """
+    return _iter_entries([str_], stats, limits)
+
+
+def iter_file(file_or_path, encoding='utf-8', stats=None, limits=None):
+    """
+    Yields the Entry instances within the given filepath or fileobj one at a
+    time. The file is read in chunks and only the current entry is kept in
+    memory, so this also works for files that are larger than the available
+    memory. With ``Limits.max_entry_size`` set, an oversized entry is
+    rejected before it is read completely.
+    """
+    try:
+        is_string = isinstance(file_or_path, basestring)
+    except NameError:
+        is_string = isinstance(file_or_path, str)
+    if is_string:
+        with codecs.open(file_or_path, 'r', encoding) as file_:
+            for entry in _iter_entries(_read_chunks(file_), stats, limits):
+                yield entry
+    else:
+        for entry in _iter_entries(_read_chunks(file_or_path), stats,
+                limits):
+            yield entry
@@ -0,0 +1,204 @@
+"""
+This module contains the ``ParseStats`` collector which can be passed to
+``parse_string``, ``parse_file`` and ``Bibliography.validate`` in order to
+find out where the time of a run actually goes::
+
+    stats = ParseStats()
+    bib = parse_file('big.bib', stats=stats)
+    bib.validate(stats=stats)
+    print(stats.as_dict())
+    stats.to_pstats().sort_stats('tottime').print_stats()
+
+If no collector is passed, none of the instrumentation is active.
+"""
+from __future__ import with_statement
+
+import contextlib
+import heapq
+import marshal
+import time
+
+from .structures import TypeRegistry
+
+
+timer = getattr(time, 'perf_counter', time.time)
+
+#: Phases are nested into each other. This maps every phase to the phase it
+#: is running in.
+PHASE_PARENTS = {
+        'parse_field': 'parse',
+        'normalize_value': 'parse_field',
+        'parse_entry': 'parse',
+        'type_lookup': 'parse_entry',
+        'parse_bibliography': 'parse',
+        'check_crossrefs': 'validate',
+        'validate_entry': 'validate',
+        }
+
+
+class ParseStats(object):
+    """
+    Collects per-phase timings and some counters while parsing and
+    validating a bibliography. ``keep`` is the number of largest entries and
+    slowest fields that are remembered.
+    """
+
+    def __init__(self, keep=10):
+        self.keep = keep
+        self.timings = {}
+        self.calls = {}
+        self.entry_types = {}
+        self.chars_processed = 0
+        self._largest_entries = []
+        self._slowest_fields = []
+
+    def add_timing(self, phase, duration):
+        """
+        Adds the duration of a single run of the given phase.
+        """
+        self.timings[phase] = self.timings.get(phase, 0.0) + duration
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+
+    @contextlib.contextmanager
+    def timer(self, phase):
+        """
+        Context manager that measures the wrapped block as one run of the
+        given phase.
+        """
+        start = timer()
+        try:
+            yield
+        finally:
+            self.add_timing(phase, timer() - start)
+
+    def record_entry(self, entry, size):
+        """
+        Counts an entry by the name its type is registered with and
+        remembers it if it belongs to the largest ones seen so far. ``size``
+        is the number of characters within the entry's field names and
+        values.
+        """
+        type_ = TypeRegistry.get_name(type(entry)) \
+                or type(entry).__name__.lower()
+        self.entry_types[type_] = self.entry_types.get(type_, 0) + 1
+        self._push(self._largest_entries, (size, entry.name))
+
+    def record_field(self, name, loc, duration):
+        """
+        Remembers a field if it belongs to the slowest ones seen so far.
+        ``loc`` is the field's position within the parsed input.
+        """
+        self._push(self._slowest_fields, (duration, name, loc))
+
+    def merge(self, other):
+        """
+        Adds the data collected by another ``ParseStats`` instance (e.g. from
+        another process) to this one.
+        """
+        for phase, duration in other.timings.items():
+            self.timings[phase] = self.timings.get(phase, 0.0) + duration
+            self.calls[phase] = self.calls.get(phase, 0) + other.calls[phase]
+        for type_, count in other.entry_types.items():
+            self.entry_types[type_] = self.entry_types.get(type_, 0) + count
+        self.chars_processed += other.chars_processed
+        for item in other._largest_entries:
+            self._push(self._largest_entries, item)
+        for item in other._slowest_fields:
+            self._push(self._slowest_fields, item)
+
+    def _push(self, heap, item):
+        if len(heap) < self.keep:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    @property
+    def largest_entries(self):
+        """
+        List of ``(size, name)`` tuples, largest entry first.
+        """
+        return sorted(self._largest_entries, reverse=True)
+
+    @property
+    def slowest_fields(self):
+        """
+        List of ``(duration, name, loc)`` tuples, slowest field first.
+        """
+        return sorted(self._slowest_fields, reverse=True)
+
+    def own_time(self, phase):
+        """
+        Returns the time spent in a phase without the time spent in the
+        phases nested into it. For the ``parse`` phase this is the time
+        pyparsing spent on tokenizing the input.
+        """
+        children = sum(self.timings.get(child, 0.0)
+                for child, parent in PHASE_PARENTS.items() if parent == phase)
+        return max(self.timings.get(phase, 0.0) - children, 0.0)
+
+    def as_dict(self):
+        """
+        Exports the collected data as plain dictionary.
+        """
+        timings = dict(self.timings)
+        if 'parse' in timings:
+            timings['tokenize'] = self.own_time('parse')
+        return {
+                'timings': timings,
+                'calls': dict(self.calls),
+                'entry_types': dict(self.entry_types),
+                'chars_processed': self.chars_processed,
+                'largest_entries': [{'name': name, 'size': size}
+                    for size, name in self.largest_entries],
+                'slowest_fields': [{'name': name, 'loc': loc,
+                    'duration': duration}
+                    for duration, name, loc in self.slowest_fields],
+                }
+
+    def as_pstats_dict(self):
+        """
+        Returns the phase timings in the format used by ``cProfile`` and
+        ``pstats`` where each phase is represented as a function.
+        """
+        stats = {}
+        for phase, total in self.timings.items():
+            calls = self.calls[phase]
+            callers = {}
+            parent = PHASE_PARENTS.get(phase)
+            if parent is not None:
+                callers[_pstats_key(parent)] = (calls, calls,
+                        self.own_time(phase), total)
+            stats[_pstats_key(phase)] = (calls, calls, self.own_time(phase),
+                    total, callers)
+        return stats
+
+    def to_pstats(self):
+        """
+        Returns a ``pstats.Stats`` instance for the phase timings.
+        """
+        import pstats
+        return pstats.Stats(_PstatsAdapter(self.as_pstats_dict()))
+
+    def dump_stats(self, filename):
+        """
+        Writes the phase timings into a file that can be loaded with
+        ``pstats`` or any other tool that understands cProfile output.
+        """
+        with open(filename, 'wb') as file_:
+            marshal.dump(self.as_pstats_dict(), file_)
+
+
+def _pstats_key(phase):
+    return ('zs.bibtex', 0, phase)
+
+
+class _PstatsAdapter(object):
+    """
+    Minimal profiler lookalike that ``pstats.Stats`` accepts as input.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
@@ -0,0 +1,187 @@
+"""
+This module contains ``SQLiteBibliography``, a bibliography that keeps its
+entries in a SQLite database instead of memory. It offers the same mapping
+interface as ``Bibliography`` but only creates Entry instances for the
+entries that are actually accessed::
+
+    bib = SQLiteBibliography('references.db')
+    bib.load(parser.iter_file('huge.bib'))
+    bib.check_crossrefs()
+    entry = bib['mm09']
+
+The entries are stored with their name, type (as registered in the
+``TypeRegistry``), crossref and their fields as JSON. Names, types and
+crossrefs are indexed.
+"""
+from __future__ import with_statement
+
+import json
+import sqlite3
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+from . import exceptions, structures
+from .export import entry_to_record
+
+
+#: Number of entries inserted within one transaction by ``load``.
+BATCH_SIZE = 10000
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    name TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    crossref TEXT,
+    fields TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_type ON entries (type);
+CREATE INDEX IF NOT EXISTS entries_crossref ON entries (crossref);
+'''
+
+
+def _entry_row(name, entry):
+    record = entry_to_record(entry)
+    return (name, record['type'], entry.get('crossref'),
+            json.dumps(record['fields']))
+
+
+class SQLiteBibliography(MutableMapping):
+    """
+    A bibliography stored in the SQLite database at ``path``. Without a path
+    an in-memory database is used.
+    """
+
+    def __init__(self, path=':memory:'):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _materialize(self, name, type_name, fields):
+        """
+        Creates the Entry instance for a database row.
+        """
+        factory = structures.TypeRegistry.get_factory(type_name)
+        if factory is None:
+            raise exceptions.UnsupportedEntryType(
+                    "%s is not a supported entry type" % type_name)
+        return factory(name, json.loads(fields).items())
+
+    def add(self, entry):
+        """
+        Add an entry based on its ``name``-attribute to the Bibliography.
+        """
+        self[entry.name] = entry
+
+    def load(self, entries, batch_size=BATCH_SIZE):
+        """
+        Adds all entries from the given iterable (e.g. ``parser.iter_file``)
+        using one transaction per ``batch_size`` entries. Returns the number
+        of added entries.
+        """
+        count = 0
+        batch = []
+        for entry in entries:
+            batch.append(_entry_row(entry.name, entry))
+            if len(batch) >= batch_size:
+                count += self._insert(batch)
+                batch = []
+        if batch:
+            count += self._insert(batch)
+        return count
+
+    def _insert(self, rows):
+        with self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO entries '
+                    '(name, type, crossref, fields) VALUES (?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def __setitem__(self, name, entry):
+        self._insert([_entry_row(name, entry)])
+
+    def __getitem__(self, name):
+        row = self.connection.execute('SELECT name, type, fields FROM entries '
+                'WHERE name = ?', (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return self._materialize(*row)
+
+    def __delitem__(self, name):
+        with self.connection:
+            cursor = self.connection.execute(
+                    'DELETE FROM entries WHERE name = ?', (name,))
+        if not cursor.rowcount:
+            raise KeyError(name)
+
+    def __contains__(self, name):
+        return self.connection.execute('SELECT 1 FROM entries WHERE name = ?',
+                (name,)).fetchone() is not None
+
+    def __iter__(self):
+        for row in self.connection.execute(
+                'SELECT name FROM entries ORDER BY rowid'):
+            yield row[0]
+
+    def __len__(self):
+        return self.connection.execute(
+                'SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def _entries(self, query, parameters=()):
+        for row in self.connection.execute(query, parameters):
+            yield self._materialize(*row)
+
+    def values(self):
+        """
+        Returns an iterator over all entries, materializing one at a time.
+        """
+        return self._entries('SELECT name, type, fields FROM entries '
+                'ORDER BY rowid')
+
+    def items(self):
+        """
+        Returns an iterator over all ``(name, entry)`` pairs.
+        """
+        return ((entry.name, entry) for entry in self.values())
+
+    def by_type(self, type_name):
+        """
+        Returns an iterator over all entries of the given type.
+        """
+        return self._entries('SELECT name, type, fields FROM entries '
+                'WHERE type = ? ORDER BY rowid', (type_name.lower(),))
+
+    def crossreferencing(self, name):
+        """
+        Returns an iterator over all entries that cross-reference the given
+        entry.
+        """
+        return self._entries('SELECT name, type, fields FROM entries '
+                'WHERE crossref = ? ORDER BY rowid', (name,))
+
+    # Validating the entries only relies on the mapping interface.
+    validate = structures.Bibliography.__dict__['validate']
+
+    def check_crossrefs(self):
+        """
+        Checks all crossreferences found in the bibliography. If one can not
+        be resolved, a BrokenCrossReferences exception is raised.
+        """
+        broken = list(self._entries('SELECT e.name, e.type, e.fields '
+                'FROM entries AS e LEFT JOIN entries AS p '
+                'ON p.name = e.crossref '
+                'WHERE e.crossref IS NOT NULL AND p.name IS NULL '
+                'ORDER BY e.rowid'))
+        if len(broken):
+            raise exceptions.BrokenCrossReferences('One or more cross reference could not'
+                    ' be resolved', broken)
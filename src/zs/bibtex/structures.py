@@ -38,6 +38,9 @@ Entry also has a handful of subclasses; one for each common entry-type
 in BibTeX.
 """
 
+import hashlib
+import json
+
 from ..bibtex import exceptions
 
 
@@ -46,6 +49,8 @@ class TypeRegistry(object):
     Global registry for entry types.
     """
     _registry = {}
+    _names = {}
+    _factories = {}
 
     @classmethod
     def register(cls, name, type_):
@@ -57,6 +62,8 @@ class TypeRegistry(object):
         if not issubclass(type_, Entry):
             raise exceptions.InvalidEntryType("%s is not a subclass of Entry" % str(type_))
         cls._registry[name.lower()] = type_
+        cls._names.setdefault(type_, name.lower())
+        cls._factories.clear()
 
     @classmethod
     def get_type(cls, name):
@@ -66,6 +73,34 @@ class TypeRegistry(object):
         """
         return cls._registry.get(name.lower())
 
+    @classmethod
+    def get_factory(cls, name):
+        """
+        Retrieve a callable that creates an entry of the given type (using
+        its name as it appears in a bibtex file, in any case) from an entry
+        name and a sequence of ``(field, value)`` pairs. The factories are
+        cached by their raw name until the next ``register`` call.
+        """
+        factory = cls._factories.get(name)
+        if factory is None:
+            type_ = cls._registry.get(name.lower())
+            if type_ is None:
+                return None
+            factory = cls._factories[name] = _entry_factory(type_)
+        return factory
+
+    @classmethod
+    def get_name(cls, type_):
+        """
+        Retrieve the name a type (or the closest of its base classes) was
+        first registered with.
+        """
+        for base in type_.__mro__:
+            name = cls._names.get(base)
+            if name is not None:
+                return name
+        return None
+
 class Bibliography(dict):
     """
     A counter for all entries of a BibTeX file. It also contains the
@@ -76,14 +111,25 @@ class Bibliography(dict):
         self.crossrefs = []
         super(Bibliography, self).__init__()
 
-    def validate(self, **kwargs):
+    def validate(self, stats=None, **kwargs):
         """
         Validates each entry (passing the provided arguments down to them and
         also tries to resolve all cross-references between the entries.
+
+        If a ``zs.bibtex.stats.ParseStats`` instance is passed as ``stats``,
+        the time spent on the validation is recorded in it.
         """
-        self.check_crossrefs()
-        for value in self.values():
-            value.validate(**kwargs)
+        if stats is None:
+            self.check_crossrefs()
+            for value in self.values():
+                value.validate(**kwargs)
+            return
+        with stats.timer('validate'):
+            with stats.timer('check_crossrefs'):
+                self.check_crossrefs()
+            for value in self.values():
+                with stats.timer('validate_entry'):
+                    value.validate(**kwargs)
 
     def check_crossrefs(self):
         """
@@ -107,6 +153,23 @@ class Bibliography(dict):
         """
         self[entry.name] = entry
 
+    def diff(self, other):
+        """
+        Returns a ``zs.bibtex.diff.BibliographyDiff`` with the entries that
+        were added, removed or modified in ``other`` compared to this
+        Bibliography.
+        """
+        from . import diff
+        return diff.diff(self, other)
+
+    def patch(self, changes, check=True):
+        """
+        Applies the changes of a ``zs.bibtex.diff.BibliographyDiff`` to this
+        Bibliography. See ``zs.bibtex.diff.patch`` for details.
+        """
+        from . import diff
+        diff.patch(self, changes, check)
+
 class Entry(dict):
     """
     A slightly enhanced dict structure that acts as representation of an entry
@@ -118,10 +181,74 @@ class Entry(dict):
     required_fields = ('title',)
     optional_fields = ('key', )
 
+    _content_hash = None
+
     def __init__(self, name=None, **kwargs):
         super(Entry, self).__init__(**kwargs)
         self.name = name
 
+    def content_hash(self):
+        """
+        Returns a hash of the entry's type and fields (but not its name). It
+        is computed once and cached until the entry is modified through its
+        dict methods. Values changed in place (e.g. by appending to the
+        author list) aren't noticed; assign the field again afterwards
+        (``entry['author'] = authors``) to drop the cached hash.
+        """
+        value = self._content_hash
+        if value is None:
+            type_name = TypeRegistry.get_name(type(self)) \
+                    or type(self).__name__.lower()
+            data = json.dumps([type_name, self], sort_keys=True)
+            value = hashlib.sha1(data.encode('utf-8')).hexdigest()
+            # Written to __dict__ directly so that this also works for
+            # entries that forbid setting attributes (e.g. frozen ones).
+            self.__dict__['_content_hash'] = value
+        return value
+
+    # All the methods modifying the entry drop the cached content hash.
+
+    def __setitem__(self, key, value):
+        self._content_hash = None
+        super(Entry, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._content_hash = None
+        super(Entry, self).__delitem__(key)
+
+    def clear(self):
+        self._content_hash = None
+        super(Entry, self).clear()
+
+    def pop(self, *args):
+        self._content_hash = None
+        return super(Entry, self).pop(*args)
+
+    def popitem(self):
+        self._content_hash = None
+        return super(Entry, self).popitem()
+
+    def setdefault(self, key, default=None):
+        self._content_hash = None
+        return super(Entry, self).setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self._content_hash = None
+        super(Entry, self).update(*args, **kwargs)
+
+    def __ior__(self, other):
+        self._content_hash = None
+        return super(Entry, self).__ior__(other)
+
+    @classmethod
+    def from_fields(cls, name, fields):
+        """
+        Creates a new entry from a sequence of ``(field, value)`` pairs. As
+        long as a subclass doesn't override ``__init__`` or ``__setitem__``,
+        the fields are added in bulk.
+        """
+        return _entry_factory(cls)(name, fields)
+
     def validate(self, raise_unsupported=False):
         """
         Checks if the Entry instance includes all the required fields of its
@@ -155,6 +282,46 @@ class Entry(dict):
                     required_fields=required_errors,
                     unsupported_fields=unsupported_fields)
 
+
+def _overrides(type_, name):
+    """
+    Checks if the given Entry subclass overrides a method of Entry. The
+    functions are compared since Python 2 creates a new unbound method
+    object on every attribute access.
+    """
+    method = getattr(type_, name)
+    base = getattr(Entry, name)
+    return getattr(method, '__func__', method) \
+            is not getattr(base, '__func__', base)
+
+
+def _entry_factory(type_):
+    """
+    Returns a function that creates an instance of the given Entry subclass
+    from a name and a sequence of ``(field, value)`` pairs. Unless the
+    subclass customizes ``__init__`` or ``__setitem__``, the dict is
+    initialized in bulk without going through either of them.
+    """
+    if _overrides(type_, '__init__') or _overrides(type_, '__setitem__'):
+        def create(name, fields):
+            entry = type_()
+            entry.name = name
+            for key, value in fields:
+                entry[key] = value
+            return entry
+        return create
+
+    new = type_.__new__
+    init = dict.__init__
+
+    def create(name, fields):
+        entry = new(type_)
+        init(entry, fields)
+        entry.name = name
+        return entry
+    return create
+
+
 # The following required_fields/optiona_fields attributes are based on
 # http://en.wikipedia.org/wiki/Bibtex
 
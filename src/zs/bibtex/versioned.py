@@ -0,0 +1,321 @@
+"""
+This module contains a versioned, copy-on-write variant of the
+``Bibliography`` for processes where many threads read a bibliography while
+another one keeps updating it.
+
+A ``VersionedBibliography`` publishes immutable ``BibliographyVersion``
+instances. Taking a snapshot just returns the current version, and a new
+version shares all unchanged entries with the previous one::
+
+    bib = VersionedBibliography(parse_file('references.bib'))
+    snapshot = bib.snapshot()       # never changes, safe to share
+    with bib.transaction() as txn:  # published atomically on exit
+        txn.add(new_entry)
+        txn.remove('obsolete')
+
+Versions hold frozen copies of the added entries: they keep their type
+(``isinstance(entry, Article)`` still holds) but can no longer be modified.
+The entries passed in stay modifiable and ``thaw_entry`` returns a
+modifiable copy of a frozen one.
+"""
+from __future__ import with_statement
+
+import contextlib
+import threading
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+from . import structures
+
+
+#: Versions keep their changes in a small overlay on top of a shared base
+#: dictionary. Once the overlay grows beyond this fraction of the base (or
+#: ``MIN_DELTA_SIZE`` entries), it is merged into a new base.
+DELTA_RATIO = 0.125
+MIN_DELTA_SIZE = 64
+
+_REMOVED = object()
+
+
+###############################################################################
+# Frozen entries
+
+def _frozen(self, *args, **kwargs):
+    raise TypeError('%s is frozen, use thaw_entry() to get a modifiable copy'
+            % self.name)
+
+
+class _FrozenEntryMixin(object):
+    """
+    Disables all the methods that would modify an entry.
+    """
+    __setitem__ = __delitem__ = _frozen
+    clear = pop = popitem = setdefault = update = _frozen
+    __ior__ = _frozen
+
+    def __setattr__(self, name, value):
+        _frozen(self)
+
+    def __reduce__(self):
+        return (_unpickle_frozen_entry, (self.__class__.__bases__[1],
+            self.name, dict(self)))
+
+
+_frozen_types = {}
+_frozen_types_lock = threading.Lock()
+
+
+def _frozen_type(type_):
+    """
+    Returns the frozen subclass of the given Entry subclass.
+    """
+    frozen = _frozen_types.get(type_)
+    if frozen is None:
+        with _frozen_types_lock:
+            frozen = _frozen_types.get(type_)
+            if frozen is None:
+                frozen = type('Frozen' + type_.__name__,
+                        (_FrozenEntryMixin, type_), {})
+                _frozen_types[type_] = frozen
+    return frozen
+
+
+def _unpickle_frozen_entry(type_, name, fields):
+    return freeze_entry(type_.from_fields(name, fields.items()))
+
+
+def freeze_entry(entry):
+    """
+    Makes the given entry immutable (in place) and returns it.
+    """
+    if not isinstance(entry, _FrozenEntryMixin):
+        entry.__class__ = _frozen_type(type(entry))
+    return entry
+
+
+def _copy_fields(entry):
+    """
+    Yields the fields of the given entry with copies of their list values
+    (e.g. authors), so the copy doesn't share them with the original.
+    """
+    for key, value in entry.items():
+        if isinstance(value, list):
+            value = list(value)
+        yield key, value
+
+
+def _frozen_copy(entry):
+    """
+    Returns a frozen copy of the given entry. Frozen entries can be shared
+    and are returned as they are.
+    """
+    if isinstance(entry, _FrozenEntryMixin):
+        return entry
+    return freeze_entry(type(entry).from_fields(entry.name,
+        _copy_fields(entry)))
+
+
+def thaw_entry(entry):
+    """
+    Returns a modifiable copy of the given entry.
+    """
+    type_ = type(entry)
+    if isinstance(entry, _FrozenEntryMixin):
+        type_ = type_.__bases__[1]
+    return type_.from_fields(entry.name, _copy_fields(entry))
+
+
+###############################################################################
+# Versions
+
+class BibliographyVersion(Mapping):
+    """
+    An immutable version of a bibliography. It offers the read-only part of
+    the ``Bibliography`` API including its validators.
+    """
+
+    def __init__(self, base, delta, length, number):
+        self._base = base
+        self._delta = delta
+        self._len = length
+        self.number = number
+
+    def __getitem__(self, name):
+        value = self._delta.get(name)
+        if value is None:
+            return self._base[name]
+        if value is _REMOVED:
+            raise KeyError(name)
+        return value
+
+    def __contains__(self, name):
+        value = self._delta.get(name)
+        if value is None:
+            return name in self._base
+        return value is not _REMOVED
+
+    def __iter__(self):
+        delta = self._delta
+        for name in self._base:
+            if name not in delta:
+                yield name
+        for name, value in delta.items():
+            if value is not _REMOVED:
+                yield name
+
+    def __len__(self):
+        return self._len
+
+    def __repr__(self):
+        return '<%s #%d with %d entries>' % (type(self).__name__,
+                self.number, self._len)
+
+    # The validators only rely on the mapping interface.
+    validate = structures.Bibliography.__dict__['validate']
+    check_crossrefs = structures.Bibliography.__dict__['check_crossrefs']
+
+    def _apply(self, changes):
+        """
+        Returns a new version with the given changes (a dictionary of names
+        to entries or ``_REMOVED``) applied.
+        """
+        length = self._len
+        for name, value in changes.items():
+            exists = name in self
+            if value is _REMOVED:
+                length -= exists
+            else:
+                length += not exists
+        delta = dict(self._delta)
+        delta.update(changes)
+        if len(delta) <= max(MIN_DELTA_SIZE, len(self._base) * DELTA_RATIO):
+            return BibliographyVersion(self._base, delta, length,
+                    self.number + 1)
+        base = dict(self._base)
+        for name, value in delta.items():
+            if value is _REMOVED:
+                base.pop(name, None)
+            else:
+                base[name] = value
+        return BibliographyVersion(base, {}, length, self.number + 1)
+
+
+class Transaction(object):
+    """
+    Collects changes to a ``VersionedBibliography`` that are published
+    together. Reads see the staged changes.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.changes = {}
+
+    def add(self, entry):
+        """
+        Adds (or replaces) an entry based on its ``name``-attribute. A
+        frozen copy of the entry is stored, later changes to the given
+        instance don't affect the bibliography.
+        """
+        self.changes[entry.name] = _frozen_copy(entry)
+
+    def remove(self, name):
+        """
+        Removes the entry with the given name.
+        """
+        if name not in self:
+            raise KeyError(name)
+        self.changes[name] = _REMOVED
+
+    def __getitem__(self, name):
+        value = self.changes.get(name)
+        if value is None:
+            return self.version[name]
+        if value is _REMOVED:
+            raise KeyError(name)
+        return value
+
+    def __contains__(self, name):
+        value = self.changes.get(name)
+        if value is None:
+            return name in self.version
+        return value is not _REMOVED
+
+
+class VersionedBibliography(Mapping):
+    """
+    A bibliography whose content is replaced atomically with every
+    published change. Reading through this object always uses the latest
+    version; use ``snapshot()`` to keep working with one version.
+    """
+
+    def __init__(self, entries=None):
+        base = {}
+        if entries is not None:
+            if isinstance(entries, Mapping):
+                entries = entries.values()
+            for entry in entries:
+                base[entry.name] = _frozen_copy(entry)
+        self._current = BibliographyVersion(base, {}, len(base), 0)
+        self._write_lock = threading.Lock()
+
+    def snapshot(self):
+        """
+        Returns the current version.
+        """
+        return self._current
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Context manager yielding a ``Transaction`` whose changes are
+        published as a new version once the block completes. If the block
+        raises an exception, nothing is published. Transactions are
+        serialized, readers are never blocked.
+        """
+        with self._write_lock:
+            txn = Transaction(self._current)
+            yield txn
+            if txn.changes:
+                self._current = self._current._apply(txn.changes)
+
+    def add(self, entry):
+        """
+        Adds an entry based on its ``name``-attribute and publishes the
+        result as new version.
+        """
+        with self.transaction() as txn:
+            txn.add(entry)
+
+    def remove(self, name):
+        """
+        Removes an entry and publishes the result as new version.
+        """
+        with self.transaction() as txn:
+            txn.remove(name)
+
+    def __getitem__(self, name):
+        return self._current[name]
+
+    def __contains__(self, name):
+        return name in self._current
+
+    def __iter__(self):
+        return iter(self._current)
+
+    def __len__(self):
+        return len(self._current)
+
+    def validate(self, stats=None, **kwargs):
+        """
+        Validates the current version.
+        """
+        self._current.validate(stats=stats, **kwargs)
+
+    def check_crossrefs(self):
+        """
+        Checks the cross references of the current version.
+        """
+        self._current.check_crossrefs()
@@ -1,6 +1,19 @@
+import os
+
+import pytest
+
 from zs.bibtex import parser
 
 
+#: Scale of the stress tests. The tests relying on timings or on memory
+#: measurements only run if it is set, as they can fail on slow or busy
+#: machines.
+STRESS_SCALE = int(os.environ.get('ZS_BIBTEX_STRESS_SCALE', '0'))
+
+stress = pytest.mark.skipif(not STRESS_SCALE,
+        reason='set ZS_BIBTEX_STRESS_SCALE to run the stress tests')
+
+
 def parse_entry(string):
     """
     Small helper function for parsing a single entry.
@@ -0,0 +1,153 @@
+from __future__ import unicode_literals
+
+import gzip
+import io
+import json
+import pickle
+
+from zs.bibtex import cli, structures
+
+
+VALID = '''@article{mm09, author={Max Mustermann}, title={Hello world},
+    journal={My Journal}, year={2009}}
+'''
+
+INVALID = '''@article{broken, author={Max Mustermann}, title={Hello world},
+    crossref={missing}}
+@article{copy, author={Max Mustermann}, title={Hello world},
+    journal={My Journal}, year={2009}}
+'''
+
+
+class Output(io.StringIO):
+    """
+    Collects the output of the command line tool, which writes native
+    strings (i.e. bytes on Python 2).
+    """
+
+    def write(self, value):
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        return super(Output, self).write(value)
+
+
+def run(argv, stdin=''):
+    stdout = Output()
+    stderr = Output()
+    code = cli.main(argv, stdin=io.StringIO(stdin), stdout=stdout,
+            stderr=stderr)
+    return code, stdout.getvalue(), stderr.getvalue()
+
+
+def write(tmpdir, name, content):
+    path = tmpdir.join(name)
+    path.write(content)
+    return str(path)
+
+
+def test_validate(tmpdir):
+    valid = write(tmpdir, 'valid.bib', VALID)
+    invalid = write(tmpdir, 'invalid.bib', INVALID)
+    assert (0, '', '') == run(['validate', valid])
+    code, out, _ = run(['validate', valid, invalid])
+    assert 1 == code
+    lines = out.splitlines()
+    assert '%s: broken: broken cross reference to missing' % invalid in lines
+    assert 2 == len(lines)
+
+
+def test_validate_alternatives(tmpdir):
+    """
+    Missing alternative fields (e.g. author or editor of a book) are listed
+    like any other missing field.
+    """
+    book = write(tmpdir, 'book.bib', '''@book{book, title={A book},
+    publisher={P}}
+@inbook{chapter, title={A chapter}, chapter={1}, year={2010}}
+''')
+    code, out, err = run(['validate', book])
+    assert 1 == code
+    assert '' == err
+    assert set([
+        '%s: book: Missing or unsupported fields found [Missing required '
+        'fields: author/editor, year]' % book,
+        '%s: chapter: Missing or unsupported fields found [Missing required '
+        'fields: author/editor, publisher]' % book,
+        ]) == set(out.splitlines())
+
+
+def test_validate_parse_error(tmpdir):
+    broken = write(tmpdir, 'broken.bib', '@article{name}')
+    code, out, err = run(['validate', broken])
+    assert 1 == code
+    assert err.startswith('%s: ParseException' % broken)
+
+
+def test_convert_stdin():
+    code, out, _ = run(['convert'], stdin=VALID)
+    assert 0 == code
+    record = json.loads(out)
+    assert 'mm09' == record['name']
+    assert 'article' == record['type']
+    assert '2009' == record['fields']['year']
+
+    code, out, _ = run(['convert', '--format', 'json', '-'], stdin=VALID)
+    assert ['mm09'] == [r['name'] for r in json.loads(out)]
+
+
+def test_convert_snapshot(tmpdir):
+    valid = write(tmpdir, 'valid.bib', VALID)
+    invalid = write(tmpdir, 'invalid.bib', INVALID)
+    output = str(tmpdir.join('out.pickle'))
+    assert 0 == run(['convert', '-f', 'snapshot', '-o', output, valid,
+        invalid])[0]
+    with open(output, 'rb') as file_:
+        bib = pickle.load(file_)
+    assert isinstance(bib, structures.Bibliography)
+    assert set(['mm09', 'broken', 'copy']) == set(bib)
+    assert 'mm09' == bib['mm09'].name
+
+    output = str(tmpdir.join('out.pickle.gz'))
+    assert 0 == run(['convert', '-f', 'snapshot', '-o', output, valid])[0]
+    with gzip.open(output, 'rb') as file_:
+        assert ['mm09'] == list(pickle.load(file_))
+
+
+def test_stats_parallel(tmpdir):
+    valid = write(tmpdir, 'valid.bib', VALID)
+    invalid = write(tmpdir, 'invalid.bib', INVALID)
+    code, out, err = run(['stats', '--jobs', '2', '--profile', valid,
+        invalid])
+    assert 0 == code
+    results = [json.loads(line) for line in out.splitlines()]
+    assert [valid, invalid] == [r['file'] for r in results]
+    assert [1, 2] == [r['entries'] for r in results]
+    assert 2 == results[1]['fields']['title']
+    assert 'parse_field' in err
+
+
+def test_dedupe(tmpdir):
+    valid = write(tmpdir, 'valid.bib', VALID)
+    invalid = write(tmpdir, 'invalid.bib', INVALID)
+    code, out, _ = run(['dedupe', valid, invalid])
+    assert 0 == code
+    assert ['%s:mm09\t%s:copy' % (valid, invalid)] == out.splitlines()
+
+
+def test_convert_csv(tmpdir):
+    output = str(tmpdir.join('out.csv'))
+    assert 0 == run(['convert', '-f', 'csv', '-o', output], stdin=VALID)[0]
+    with open(output) as file_:
+        lines = file_.read().splitlines()
+    assert 'name,type,author,editor,title,booktitle,journal,publisher,year,' \
+            'other_fields' == lines[0]
+    assert lines[1].startswith('mm09,article,Max Mustermann,')
+
+    for jobs in ('1', '2'):
+        code, out, _ = run(['convert', '-f', 'csv', '--jobs', jobs,
+            '--fields', 'name, year,other_fields', '-'], stdin=INVALID)
+        assert 0 == code
+        assert ['name,year,other_fields',
+                'broken,,"{""author"": ""Max Mustermann"", ""crossref"": '
+                '""missing"", ""title"": ""Hello world""}"'] == \
+                        out.splitlines()[:2]
@@ -25,3 +25,79 @@ def test_invalid_entryclass():
         pass
     with pytest.raises(exceptions.InvalidEntryType):
             structures.TypeRegistry.register('test', TestEntryType)
+
+
+def test_reregistered_type():
+    """
+    Registering a new type for an existing name takes effect for the
+    following parses.
+    """
+
+    class FirstType(structures.Entry):
+        pass
+
+    class SecondType(structures.Entry):
+        pass
+    structures.TypeRegistry.register('reregistered', FirstType)
+    assert FirstType == type(parse_entry('@Reregistered{name, title={test}}'))
+    structures.TypeRegistry.register('reregistered', SecondType)
+    assert SecondType == type(parse_entry('@Reregistered{name, title={test}}'))
+
+
+def test_custom_setitem():
+    """
+    Entry types that customize ``__setitem__`` still get their fields
+    assigned through it.
+    """
+
+    class UppercaseEntry(structures.Entry):
+        def __setitem__(self, key, value):
+            super(UppercaseEntry, self).__setitem__(key, value.upper())
+    structures.TypeRegistry.register('uppercase', UppercaseEntry)
+
+    entry = parse_entry('@uppercase{name, title={test}}')
+    assert UppercaseEntry == type(entry)
+    assert 'name' == entry.name
+    assert {'title': 'TEST'} == entry
+
+
+def test_custom_init():
+    """
+    Entry types whose ``__init__`` doesn't accept the name are created
+    without arguments, with the name set afterwards.
+    """
+
+    class KeywordEntry(structures.Entry):
+        def __init__(self, **kwargs):
+            super(KeywordEntry, self).__init__()
+            self.kwargs = kwargs
+    structures.TypeRegistry.register('keywordentry', KeywordEntry)
+
+    entry = parse_entry('@keywordentry{name, title={test}}')
+    assert KeywordEntry == type(entry)
+    assert 'name' == entry.name
+    assert {} == entry.kwargs
+    assert {'title': 'test'} == entry
+
+
+def test_bulk_construction(monkeypatch):
+    """
+    Entry types that don't customize ``__init__`` or ``__setitem__`` get
+    their fields assigned in bulk.
+    """
+    calls = []
+
+    def setitem(self, key, value):
+        calls.append(key)
+        dict.__setitem__(self, key, value)
+    monkeypatch.setattr(structures.Entry, '__setitem__', setitem)
+
+    class PlainEntry(structures.Entry):
+        pass
+    for type_ in (structures.Article, PlainEntry):
+        create = structures._entry_factory(type_)
+        entry = create('name', [('title', 'test')])
+        assert type_ == type(entry)
+        assert 'name' == entry.name
+        assert {'title': 'test'} == entry
+    assert [] == calls
@@ -0,0 +1,139 @@
+import pytest
+
+from zs.bibtex import diff, exceptions, structures
+from .helpers import parse_bibliography, parse_entry
+
+
+OLD = '''@article{mm09, author={Max Mustermann}, title={Hello world},
+    journal={My Journal}, year={2009}}
+@book{book, editor={Max Mustermann}, title={A book}, publisher={P},
+    year=2010}
+@misc{gone, title={Removed}}
+'''
+
+NEW = '''@article{mm09, author={Max Mustermann and Erika Mustermann},
+    title={Hello world}, journal={My Journal}, volume={1}}
+@book{book, editor={Max Mustermann}, title={A book}, publisher={P},
+    year=2010}
+@misc{new, title={Added}}
+'''
+
+
+def test_content_hash():
+    """
+    The content hash depends on the type and fields but not on the name and
+    is updated once the entry is modified.
+    """
+    entry = parse_entry('@article{a, title={Hello}}')
+    other = parse_entry('@article{b, title={Hello}}')
+    misc = parse_entry('@misc{a, title={Hello}}')
+    assert entry.content_hash() == other.content_hash()
+    assert entry.content_hash() != misc.content_hash()
+    original = entry.content_hash()
+    entry['title'] = 'Changed'
+    assert original != entry.content_hash()
+    del entry['title']
+    entry.update(title='Hello')
+    assert original == entry.content_hash()
+    entry.setdefault('year', '2009')
+    assert original != entry.content_hash()
+
+
+def test_content_hash_in_place_changes():
+    """
+    Values changed in place don't drop the cached content hash, assigning
+    the field again does.
+    """
+    old = parse_bibliography('@article{a, author={Max Mustermann and Erika '
+            'Mustermann}}')
+    new = parse_bibliography('@article{a, author={Max Mustermann and Erika '
+            'Mustermann}}')
+    entry = new['a']
+    original = entry.content_hash()
+    entry['author'].append('John Doe')
+    assert original == entry.content_hash()
+    assert not old.diff(new)
+    entry['author'] = entry['author']
+    assert original != entry.content_hash()
+    changes = old.diff(new)
+    assert ['a'] == list(changes.modified)
+    assert {'author': (['Max Mustermann', 'Erika Mustermann'],
+        ['Max Mustermann', 'Erika Mustermann', 'John Doe'])} == \
+                changes.modified['a'].changed
+
+
+def test_diff():
+    old = parse_bibliography(OLD)
+    new = parse_bibliography(NEW)
+    changes = old.diff(new)
+    assert 3 == len(changes)
+    assert ['new'] == list(changes.added)
+    assert ['gone'] == list(changes.removed)
+    delta = changes.modified['mm09']
+    assert {'volume': '1'} == delta.added
+    assert {'year': '2009'} == delta.removed
+    assert {'author': ('Max Mustermann',
+        ['Max Mustermann', 'Erika Mustermann'])} == delta.changed
+    assert not old.diff(parse_bibliography(OLD))
+
+
+def test_type_change():
+    old = parse_bibliography('@misc{a, title={Hello}}')
+    new = parse_bibliography('@manual{a, title={Hello}}')
+    changes = old.diff(new)
+    assert 'manual' == changes.modified['a'].new_type
+    old.patch(changes)
+    assert structures.Manual == type(old['a'])
+
+
+def test_patch():
+    old = parse_bibliography(OLD)
+    new = parse_bibliography(NEW)
+    target = parse_bibliography(OLD)
+    target.patch(old.diff(new))
+    assert new == target
+    assert not target.diff(new)
+
+    with pytest.raises(exceptions.PatchConflict):
+        parse_bibliography(NEW).patch(old.diff(new))
+    target = parse_bibliography(NEW)
+    target.patch(old.diff(new), check=False)
+    assert new == target
+
+
+def test_sorted_changes():
+    old = parse_bibliography(OLD)
+    new = parse_bibliography(NEW)
+    by_name = lambda bib: [bib[name] for name in sorted(bib)]
+    changes = list(diff.iter_sorted_changes(by_name(old), by_name(new)))
+    assert [(diff.REMOVED, 'gone'), (diff.MODIFIED, 'mm09'),
+            (diff.ADDED, 'new')] == [c[:2] for c in changes]
+    old.patch(changes)
+    assert new == old
+
+    with pytest.raises(ValueError):
+        list(diff.iter_sorted_changes(old.values(), by_name(new)))
+
+
+def test_streamed_changes():
+    """
+    New entries can be streamed against an old version kept on disk.
+    """
+    from zs.bibtex import parser
+    from zs.bibtex.storage import SQLiteBibliography
+    old = SQLiteBibliography()
+    old.load(parser.iter_string(OLD))
+    changes = diff.BibliographyDiff(diff.iter_changes(old,
+        parser.iter_string(NEW)))
+    assert ['new'] == list(changes.added)
+    assert ['gone'] == list(changes.removed)
+    assert ['mm09'] == list(changes.modified)
+    diff.patch(old, changes)
+    assert parse_bibliography(NEW) == dict(old.items())
+
+
+def test_frozen_entries():
+    from zs.bibtex import versioned
+    expected = parse_entry('@article{a, title={Hello}}').content_hash()
+    entry = versioned.freeze_entry(parse_entry('@article{a, title={Hello}}'))
+    assert expected == entry.content_hash()
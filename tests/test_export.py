@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import csv
+import gzip
+import io
+import json
+
+from zs.bibtex import export, parser, structures
+
+
+INPUT = '''@article{mm09, author={Max Mustermann and Erika Mustermann},
+    title={Hello world}, journal={My Journal}, year={2009}}
+% a comment in between
+@book{book, editor={Max Mustermann}, title={A book}, publisher={P},
+    year=2010}
+'''
+
+
+def test_iter_string():
+    """
+    Streaming the entries should produce the same entries as parsing the
+    whole bibliography.
+    """
+    entries = list(parser.iter_string(INPUT))
+    assert ['mm09', 'book'] == [e.name for e in entries]
+    bib = parser.parse_string(INPUT)
+    for entry in entries:
+        assert bib[entry.name] == entry
+        assert type(bib[entry.name]) == type(entry)
+
+
+def test_iter_file_chunks(monkeypatch):
+    """
+    Entries spanning multiple chunks are put back together.
+    """
+    monkeypatch.setattr(parser, 'CHUNK_SIZE', 3)
+    entries = list(parser.iter_file(io.StringIO(INPUT)))
+    assert ['mm09', 'book'] == [e.name for e in entries]
+    assert ['Max Mustermann', 'Erika Mustermann'] == entries[0]['author']
+
+
+def test_entry_record():
+    class Custom(structures.Entry):
+        pass
+    structures.TypeRegistry.register('customtype', Custom)
+    entry = list(parser.iter_string('@CustomType{name, title={x}}'))[0]
+    assert {'name': 'name', 'type': 'customtype',
+            'fields': {'title': 'x'}} == export.entry_to_record(entry)
+
+
+def test_write_jsonl(tmpdir):
+    path = str(tmpdir.join('out.jsonl.gz'))
+    assert 2 == export.write_jsonl(parser.iter_string(INPUT), path)
+    with gzip.open(path, 'rt') as file_:
+        records = [json.loads(line) for line in file_]
+    assert ['mm09', 'book'] == [r['name'] for r in records]
+    assert ['article', 'book'] == [r['type'] for r in records]
+    assert ['Max Mustermann', 'Erika Mustermann'] == \
+            records[0]['fields']['author']
+
+
+def test_write_csv(tmpdir):
+    path = str(tmpdir.join('out.csv'))
+    export.write_csv(parser.iter_string(INPUT), path,
+            fields=('name', 'type', 'author', 'year'))
+    with io.open(path, newline='') as file_:
+        rows = list(csv.reader(file_))
+    assert [['name', 'type', 'author', 'year'],
+            ['mm09', 'article', 'Max Mustermann and Erika Mustermann', '2009'],
+            ['book', 'book', '', '2010']] == rows
+
+
+def test_csv_other_fields():
+    """
+    Fields without a column of their own are kept as JSON in the
+    OTHER_FIELDS column.
+    """
+    entries = parser.iter_string(INPUT + '@inbook{chapter, crossref={book}, '
+            'title={A chapter}, pages={1--10}, note={Ärger}}')
+    output = io.StringIO()
+    export.write_csv(entries, output)
+    rows = list(csv.reader(output.getvalue().splitlines()))
+    assert list(export.CSV_FIELDS) == rows[0]
+    assert '' == rows[1][-1]
+    assert {'crossref': 'book', 'pages': '1--10', 'note': 'Ärger'} == \
+            json.loads(rows[3][-1])
+
+    output = io.StringIO()
+    export.write_csv(parser.iter_string(INPUT), output,
+            fields=('name', 'year', export.OTHER_FIELDS))
+    rows = list(csv.reader(output.getvalue().splitlines()))
+    assert {'author': ['Max Mustermann', 'Erika Mustermann'],
+            'title': 'Hello world', 'journal': 'My Journal'} == \
+                    json.loads(rows[1][2])
+
+
+def test_non_ascii(tmpdir):
+    """
+    Non-ASCII values are written as UTF-8.
+    """
+    entries = list(parser.iter_string(
+        '@book{b, editor={Jürgen Müller}, title={Ärger}, year=2010}'))
+    path = str(tmpdir.join('out.jsonl'))
+    export.write_jsonl(entries, path)
+    with io.open(path, encoding='utf-8') as file_:
+        assert 'Jürgen Müller' == json.loads(file_.read())['fields']['editor']
+    path = str(tmpdir.join('out.csv'))
+    export.write_csv(entries, path, fields=('name', 'editor', 'title'))
+    with io.open(path, encoding='utf-8', newline='') as file_:
+        assert ['name,editor,title', 'b,Jürgen Müller,Ärger'] == \
+                file_.read().splitlines()
+
+    output = io.StringIO()
+    export.write_csv(entries, output, fields=('editor',))
+    assert 'editor\r\nJürgen Müller\r\n' == output.getvalue()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import io
+import json
+import os
+import sys
+
+from zs.bibtex import extract, parser, structures
+from zs.bibtex.stats import ParseStats
+
+
+INPUT = '''% A shared bibliography
+@article{mm09, author={Max Mustermann and Erika Mustermann},
+    title={Hello {world}}, journal="My Journal", year={2009}}
+@unsupported{other, title={Not parsed unless requested}}
+@inbook{chapter, crossref={book}, title={A chapter}, pages={1--10}}
+@inproceedings{paper, crossref={proceedings}, title={A paper},
+    author={Jürgen Müller}}
+@book{book, editor={Max Mustermann}, title={A book}, publisher={P},
+    year=2010, crossref={series}}
+@book{series, editor={Erika Mustermann}, title={A series}, publisher={P},
+    year=2000}
+@proceedings{proceedings, title={Proceedings}, year=2011}
+'''
+
+AUX = r'''\relax
+\citation{mm09}
+\citation{chapter, missing}
+\@input{appendix.aux}
+'''
+
+
+def write(tmpdir, text=INPUT, name='shared.bib'):
+    path = tmpdir.join(name)
+    path.write_text(text, 'utf-8')
+    return str(path)
+
+
+def names(bib):
+    """
+    Returns the names of the entries in the order of the file on Python
+    versions that keep the insertion order of dicts, sorted otherwise.
+    """
+    if sys.version_info >= (3, 7):
+        return list(bib)
+    return sorted(bib)
+
+
+def ordered(*names):
+    if sys.version_info >= (3, 7):
+        return list(names)
+    return sorted(names)
+
+
+def test_extract(tmpdir):
+    path = write(tmpdir)
+    bib = extract.extract(path, ['chapter', 'mm09', 'missing'])
+    assert isinstance(bib, structures.Bibliography)
+    # Cross references are followed transitively and the entries keep the
+    # order of the file.
+    assert ordered('mm09', 'chapter', 'book', 'series') == names(bib)
+    expected = parser.parse_string(INPUT.replace('@unsupported', '@misc'))
+    for name in bib:
+        assert expected[name] == bib[name]
+    bib.check_crossrefs()
+
+    bib = extract.extract(path, ['paper'])
+    assert ordered('paper', 'proceedings') == names(bib)
+    assert 'Jürgen Müller' == bib['paper']['author']
+    index = extract.build_index(path)
+    del index['other']
+    assert 6 == len(extract.extract(path, [extract.ALL], index=index))
+
+
+def test_file_object():
+    data = INPUT.encode('utf-8')
+    stats = ParseStats()
+    bib = extract.extract(io.BytesIO(data), ['book'], stats=stats)
+    assert ordered('book', 'series') == names(bib)
+    assert 1 == stats.calls['index']
+    assert {'book': 2} == stats.entry_types
+    # An index of another file is noticed and replaced.
+    index = extract.build_index(io.BytesIO(b'\n' + data))
+    bib = extract.extract(io.BytesIO(data), ['book'], index=index)
+    assert ordered('book', 'series') == names(bib)
+
+
+def test_read_aux_citations(tmpdir):
+    tmpdir.mkdir('sub')
+    aux = tmpdir.join('paper.aux')
+    aux.write_text(AUX, 'utf-8')
+    tmpdir.join('appendix.aux').write_text(
+            '\\citation{paper}\n\\@input{sub/more.aux}\n', 'utf-8')
+    tmpdir.join('sub', 'more.aux').write_text(
+            '\\citation{mm09,book}\n\\@input{paper.aux}\n'
+            '\\@input{sub/missing.aux}\n', 'utf-8')
+    keys = extract.read_aux_citations(str(aux))
+    assert set(['mm09', 'chapter', 'missing', 'paper', 'book']) == keys
+    assert set(['mm09', 'chapter', 'missing']) == \
+            extract.read_aux_citations(io.StringIO(AUX))
+
+    bib = extract.extract_aux(str(aux), write(tmpdir))
+    assert ordered('mm09', 'chapter', 'paper', 'book', 'series',
+            'proceedings') == names(bib)
+
+
+def test_cached_index(tmpdir, monkeypatch):
+    path = write(tmpdir)
+    index = extract.load_index(path)
+    assert os.path.exists(path + extract.INDEX_SUFFIX)
+    assert extract.build_index(path) == index
+
+    def fail(*args):
+        raise AssertionError('The index was rebuilt')
+    with monkeypatch.context() as patch:
+        patch.setattr(extract, 'build_index', fail)
+        assert index == extract.load_index(path)
+        assert ['mm09'] == names(extract.extract(path, ['mm09'], cache=True))
+
+    # Modifying the file invalidates the cache.
+    write(tmpdir, '@misc{new, title={New}}\n' + INPUT)
+    assert ['new'] == names(extract.extract(path, ['new'], cache=True))
+    assert index != extract.load_index(path)
+
+    # So do changes that keep the size and modification time but move the
+    # entries.
+    stat = os.stat(path)
+    write(tmpdir, INPUT + '%' + ' ' * 22 + '\n')
+    os.utime(path, (stat.st_atime, stat.st_mtime))
+    assert ['mm09'] == names(extract.extract(path, ['mm09'], cache=True))
+    with open(path + extract.INDEX_SUFFIX) as file_:
+        assert 'new' not in json.load(file_)['entries']
+
+
+def test_unwritable_index(tmpdir, monkeypatch):
+    """
+    An index that can't be stored is still used.
+    """
+    path = write(tmpdir)
+    index_path = str(tmpdir.join('missing', 'shared.bib.idx'))
+    assert extract.build_index(path) == extract.load_index(path, index_path)
+
+    def fail(*args):
+        raise OSError('Read-only file system')
+    monkeypatch.setattr(os, 'rename', fail)
+    if hasattr(os, 'replace'):
+        monkeypatch.setattr(os, 'replace', fail)
+    assert ['mm09'] == names(extract.extract(path, ['mm09'], cache=True))
+    assert ['shared.bib'] == os.listdir(str(tmpdir))
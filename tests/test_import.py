@@ -0,0 +1,95 @@
+import os
+import subprocess
+import sys
+
+import warnings
+
+from zs.bibtex import parser
+from .helpers import stress
+
+
+IMPORT_SCRIPT = '''
+import sys, time
+start = time.time()
+import zs.bibtex.parser
+print(time.time() - start)
+print('pyparsing' in sys.modules)
+print('pkg_resources' in sys.modules)
+print(zs.bibtex.parser._grammar is None)
+'''
+
+#: Upper bound for ``import zs.bibtex.parser`` in a fresh interpreter. This is
+#: deliberately generous so that slow CI machines don't trip it, but it is
+#: still far below the time the eager pyparsing import took.
+IMPORT_BUDGET = 0.15
+
+
+def run_import():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(sys.path)
+    output = subprocess.check_output([sys.executable, '-c', IMPORT_SCRIPT],
+            env=env, universal_newlines=True)
+    return output.split()
+
+
+def test_import_is_lazy():
+    """
+    Importing the parser module must neither import pyparsing nor build the
+    grammar.
+    """
+    _, pyparsing_loaded, _, grammar_missing = run_import()
+    assert pyparsing_loaded == 'False'
+    assert grammar_missing == 'True'
+
+
+def test_namespace_is_lightweight():
+    """
+    The zs namespace package must not import pkg_resources, which takes
+    several times as long as the rest of the import.
+    """
+    assert run_import()[2] == 'False'
+
+
+@stress
+def test_import_budget():
+    """
+    Importing the parser module should stay within the import-time budget.
+    """
+    duration = min(float(run_import()[0]) for _ in range(3))
+    assert duration < IMPORT_BUDGET
+
+
+def test_grammar_attributes():
+    """
+    The grammar elements are still available as module attributes.
+    """
+    assert '{a}' == parser.bstring.parseString('{{a}}')[0]
+    if sys.version_info >= (3, 7):
+        assert parser.bstring is parser.get_grammar()['bstring']
+        assert parser.pattern is parser.get_grammar()['pattern']
+
+
+def test_lazy_element():
+    """
+    The proxies used for the module attributes before Python 3.7 behave like
+    the elements themselves.
+    """
+    label = parser._LazyElement('label')
+    field_value = parser._LazyElement('field_value')
+    assert ['a', 'b'] == list((label + field_value).parseString('a {b}'))
+    assert ['a', 'b'] == list(('a' + field_value).parseString('a {b}'))
+    assert ['1'] == list((label | field_value).parseString('1'))
+    assert 'a' == label.parseString('a')[0]
+
+
+def test_deprecated_elements():
+    """
+    Elements that are no longer part of the grammar still work but issue a
+    DeprecationWarning.
+    """
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        result = parser.bstring_nested.parseString('{a {b}}')
+    assert ['{', 'a ', '{', 'b', '}', '}'] == list(result)
+    assert DeprecationWarning in [w.category for w in caught]
+    assert 'bstring_nested' not in parser.get_grammar()
@@ -181,3 +181,54 @@ def test_file_as_object(tmpdir):
     with io.open(str(test_file), encoding='utf-8') as fp:
         with pytest.raises(exceptions.InvalidStructure):
             parser.parse_file(fp, validate=True)
+
+
+def disable_packrat():
+    if hasattr(pyparsing.ParserElement, 'disable_memoization'):
+        pyparsing.ParserElement.disable_memoization()
+    else:
+        pyparsing.ParserElement._packratEnabled = False
+        pyparsing.ParserElement._parse = \
+                pyparsing.ParserElement._parseNoCache
+
+
+def check_packrat(cache_size_limit=16):
+    inp = '''@article{name, author = {Max {Mustermann}},
+        title = {{Nested {braces}} in {the} title},
+        journal = "Life Journale", year = 2009}'''
+    expected = parse_entry(inp)
+    parser.enable_packrat(cache_size_limit=cache_size_limit)
+    try:
+        assert pyparsing.ParserElement._packratEnabled
+        assert expected == parse_entry(inp)
+        assert expected == parse_entry(inp)
+    finally:
+        disable_packrat()
+
+
+def test_packrat():
+    """
+    Parsing with packrat memoization enabled should produce the same
+    results.
+    """
+    check_packrat()
+
+
+def test_packrat_without_size_limit(monkeypatch):
+    """
+    pyparsing versions whose enablePackrat doesn't take a cache size are
+    supported as well.
+    """
+    enable = pyparsing.ParserElement.enablePackrat
+    calls = []
+
+    def enable_packrat():
+        calls.append(())
+        try:
+            enable(None)
+        except TypeError:
+            enable()
+    monkeypatch.setattr(pyparsing.ParserElement, 'enablePackrat',
+            staticmethod(enable_packrat))
+    check_packrat()
+    assert [()] == calls
@@ -42,3 +42,17 @@ def test_multiline_blockliteral():
             Mustermann}, title={Hello world}}"""
     entry = parse_entry(inp)
     assert 'Max Mustermann' == entry.get('author')
+
+
+def test_bstring_skipped_text():
+    """
+    Whitespace following a brace within nested braces and comments
+    following a brace are dropped, just like the recursive grammar used to.
+    """
+    bstring = parser.bstring
+    assert 'Hello {World}' == bstring.parseString('{Hello { World}}')[0]
+    assert 'a {b} c' == bstring.parseString('{a {b} c}')[0]
+    assert 'a{b{c}d} e' == bstring.parseString('{a{b{ c} d} e}')[0]
+    assert 'a{b} d' == bstring.parseString('{a{b} %c\n d}')[0]
+    assert 'a{b}' == bstring.parseString('{a{ %c}\n b}}')[0]
+    assert r'50\% off' == bstring.parseString(r'{50\% off}')[0]
@@ -0,0 +1,84 @@
+import pstats
+
+import pytest
+
+from zs.bibtex import parser, exceptions, structures
+from zs.bibtex.stats import ParseStats
+
+
+INPUT = '''@article{short, author={Max Mustermann}, title={Hello world},
+    journal={My Journal}, year={2009}}
+@book{long, author={Max Mustermann and Erika Mustermann},
+    title={A much longer title of a book}, publisher={Publisher},
+    year={2010}}
+'''
+
+
+def test_parse_and_validate():
+    """
+    Parsing and validating should record timings for each phase as well as
+    the counters.
+    """
+    stats = ParseStats()
+    bib = parser.parse_string(INPUT, validate=True, stats=stats)
+    assert 2 == len(bib)
+    data = stats.as_dict()
+    for phase in ('parse', 'tokenize', 'parse_field', 'normalize_value',
+            'parse_entry', 'type_lookup', 'parse_bibliography', 'validate',
+            'check_crossrefs', 'validate_entry'):
+        assert phase in data['timings']
+    assert 8 == data['calls']['parse_field']
+    assert 2 == data['calls']['validate_entry']
+    assert {'article': 1, 'book': 1} == data['entry_types']
+    assert len(INPUT) == data['chars_processed']
+    assert ['long', 'short'] == [e['name'] for e in data['largest_entries']]
+    assert 8 == len(data['slowest_fields'])
+
+
+def test_registered_type_names():
+    """
+    Entries are counted by the name their type is registered with.
+    """
+    class WebEntry(structures.Entry):
+        pass
+    structures.TypeRegistry.register('online', WebEntry)
+    stats = ParseStats()
+    parser.parse_string('@online{web, title={A website}}', stats=stats)
+    assert {'online': 1} == stats.entry_types
+
+
+def test_keep():
+    """
+    Only the configured number of largest entries and slowest fields is
+    kept.
+    """
+    stats = ParseStats(keep=1)
+    parser.parse_string(INPUT, stats=stats)
+    assert 'long' == stats.largest_entries[0][1]
+    assert 1 == len(stats.largest_entries)
+    assert 1 == len(stats.slowest_fields)
+
+
+def test_failed_parse():
+    """
+    The per-thread state is reset even if the parse fails.
+    """
+    stats = ParseStats()
+    with pytest.raises(exceptions.UnsupportedEntryType):
+        parser.parse_string('@unknown{name, title={test}}', stats=stats)
+    assert parser._state.stats is None
+
+
+def test_pstats(tmpdir):
+    """
+    The timings can be exported into the pstats format.
+    """
+    stats = ParseStats()
+    parser.parse_string(INPUT, stats=stats)
+    profile = stats.to_pstats()
+    assert ('zs.bibtex', 0, 'parse_field') in profile.stats
+    filename = str(tmpdir.join('parse.prof'))
+    stats.dump_stats(filename)
+    loaded = pstats.Stats(filename)
+    assert set(profile.stats) == set(loaded.stats)
+    loaded.sort_stats('tottime')
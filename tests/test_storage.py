@@ -0,0 +1,94 @@
+import pytest
+
+from zs.bibtex import exceptions, parser, structures
+from zs.bibtex.storage import SQLiteBibliography
+
+
+INPUT = '''@article{mm09, author={Max Mustermann and Erika Mustermann},
+    title={Hello world}, journal={My Journal}, year={2009}}
+@book{book, editor={Max Mustermann}, title={A book}, publisher={P},
+    year=2010}
+@inbook{chapter, crossref={book}, title={A chapter}, pages={1--10}}
+'''
+
+
+def make_bibliography(path=':memory:', batch_size=2):
+    """
+    Loads INPUT into a new SQLiteBibliography, using several batches.
+    """
+    bib = SQLiteBibliography(path)
+    assert 3 == bib.load(parser.iter_string(INPUT), batch_size=batch_size)
+    return bib
+
+
+def test_mapping():
+    """
+    The bibliography behaves like the dictionary of a parsed
+    Bibliography, including adding and removing entries.
+    """
+    bib = make_bibliography()
+    assert 3 == len(bib)
+    assert ['mm09', 'book', 'chapter'] == list(bib)
+    assert 'book' in bib and 'missing' not in bib
+    entry = bib['mm09']
+    assert structures.Article == type(entry)
+    assert 'mm09' == entry.name
+    assert ['Max Mustermann', 'Erika Mustermann'] == entry['author']
+    assert parser.parse_string(INPUT) == dict(bib.items())
+    with pytest.raises(KeyError):
+        bib['missing']
+
+    del bib['mm09']
+    assert 2 == len(bib)
+    with pytest.raises(KeyError):
+        del bib['mm09']
+    entry['title'] = 'Changed'
+    bib.add(entry)
+    assert 'Changed' == bib['mm09']['title']
+
+
+def test_queries():
+    """
+    Entries can be looked up by their type and by the entry they
+    cross-reference.
+    """
+    bib = make_bibliography()
+    assert ['book'] == [e.name for e in bib.by_type('BOOK')]
+    assert ['chapter'] == [e.name for e in bib.crossreferencing('book')]
+
+
+def test_crossrefs():
+    """
+    Cross-references to removed entries are reported as broken.
+    """
+    bib = make_bibliography()
+    bib.check_crossrefs()
+    del bib['book']
+    with pytest.raises(exceptions.BrokenCrossReferences) as excinfo:
+        bib.check_crossrefs()
+    assert ['chapter'] == [e.name for e in excinfo.value.entries]
+    with pytest.raises(exceptions.BrokenCrossReferences):
+        bib.validate()
+
+
+def test_validate():
+    """
+    Validating checks the required fields of all entries.
+    """
+    bib = make_bibliography()
+    with pytest.raises(exceptions.InvalidStructure):
+        bib.validate()
+    del bib['chapter']
+    bib.validate()
+
+
+def test_persistence(tmpdir):
+    """
+    Entries stored in a database file are still there after reopening it.
+    """
+    path = str(tmpdir.join('references.db'))
+    with make_bibliography(path):
+        pass
+    with SQLiteBibliography(path) as bib:
+        assert 3 == len(bib)
+        assert 'A book' == bib['book']['title']
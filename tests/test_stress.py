@@ -0,0 +1,237 @@
+"""
+Stress and fuzz tests for the worst cases of the grammar: deeply nested
+braces, unterminated values and huge fields or entries. The tests relying
+on timings or memory measurements only run if the
+``ZS_BIBTEX_STRESS_SCALE`` environment variable is set, which also scales
+up the inputs.
+"""
+from __future__ import unicode_literals
+
+import io
+import random
+import time
+import warnings
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import pyparsing
+import pytest
+
+from zs.bibtex import exceptions, parser
+from .helpers import STRESS_SCALE, stress
+
+
+SCALE = max(STRESS_SCALE, 1)
+
+#: Exceptions the parser may raise for broken input; anything else
+#: (e.g. a RecursionError) is a bug.
+EXPECTED_ERRORS = (pyparsing.ParseException, exceptions.UnsupportedEntryType,
+        exceptions.LimitExceeded)
+
+ENTRY = '''@article{name%d,
+    author = {Max Mustermann and Erika Mustermann},
+    title = {The {story} of my {life}},
+    journal = "Life Journale",
+    year = 2009,
+}
+'''
+
+
+def entries(count):
+    return ''.join(ENTRY % i for i in range(count))
+
+
+def nested(depth):
+    return '@misc{deep, title={%sx%s}}' % ('{' * depth, '}' * depth)
+
+
+def large_field(size, quote=False):
+    if quote:
+        return '@misc{large, title="%s"}' % ('x ' * (size // 2))
+    return '@misc{large, title={%s}}' % ('x ' * (size // 2))
+
+
+def duration(function, *args):
+    start = time.time()
+    function(*args)
+    return time.time() - start
+
+
+def scaling(function, make_input, size, factor=4):
+    """
+    Returns the ratio between the parse times of an input ``factor`` times
+    as large and the original one.
+    """
+    small = make_input(size)
+    large = make_input(size * factor)
+    # Warm up (e.g. the grammar construction) before measuring.
+    function(small)
+    return min(duration(function, large) for _ in range(2)) / \
+            max(min(duration(function, small) for _ in range(2)), 1e-4)
+
+
+@pytest.mark.parametrize('parse', [parser.parse_string,
+    lambda text: list(parser.iter_string(text))])
+def test_deep_nesting(parse):
+    """
+    Nesting depth is not limited by Python's recursion limit.
+    """
+    parse(nested(5000 * SCALE))
+
+
+def test_max_depth():
+    limits = parser.Limits(max_depth=10)
+    parser.parse_string(nested(9), limits=limits)
+    with pytest.raises(exceptions.LimitExceeded) as excinfo:
+        parser.parse_string(nested(11), limits=limits)
+    assert 'max_depth' == excinfo.value.limit
+    with pytest.raises(exceptions.LimitExceeded):
+        list(parser.iter_string(nested(11), limits=limits))
+
+
+@pytest.mark.parametrize('quote', [False, True])
+def test_max_field_size(quote):
+    limits = parser.Limits(max_field_size=1000)
+    parser.parse_string(large_field(1000, quote), limits=limits)
+    with pytest.raises(exceptions.LimitExceeded) as excinfo:
+        parser.parse_string(large_field(1002, quote), limits=limits)
+    assert 'max_field_size' == excinfo.value.limit
+
+
+def test_max_entry_size():
+    """
+    Oversized entries are rejected before they have been read completely.
+    """
+    limits = parser.Limits(max_entry_size=1000)
+    parser.parse_string(entries(10), limits=limits)
+    with pytest.raises(exceptions.LimitExceeded):
+        parser.parse_string(large_field(2000), limits=limits)
+
+    reads = []
+
+    class File(io.StringIO):
+        def read(self, size=-1):
+            reads.append(size)
+            return super(File, self).read(size)
+    with pytest.raises(exceptions.LimitExceeded) as excinfo:
+        list(parser.iter_file(File(large_field(10 * parser.CHUNK_SIZE)),
+            limits=limits))
+    assert 'max_entry_size' == excinfo.value.limit
+    assert 1 == len(reads)
+
+
+UNTERMINATED = [
+    '@misc{a, title={never closed}',
+    '@misc{a, title="never closed}',
+    "@misc{a, title='never closed}",
+    '@misc{a, title={' + '{' * 1000,
+    '@misc{a, title="' + 'x\\"' * 10000,
+    ]
+UNTERMINATED_IDS = ['braces', 'double-quotes', 'single-quotes', 'nested',
+        'escaped-quotes']
+
+
+@pytest.mark.parametrize('text', UNTERMINATED, ids=UNTERMINATED_IDS)
+def test_unterminated(text):
+    """
+    Unterminated values fail with a ParseException.
+    """
+    with pytest.raises(pyparsing.ParseException):
+        parser.parse_string(text)
+    with pytest.raises(pyparsing.ParseException):
+        list(parser.iter_string(text))
+
+
+@stress
+@pytest.mark.parametrize('text', UNTERMINATED, ids=UNTERMINATED_IDS)
+def test_unterminated_fails_fast(text):
+    """
+    Unterminated values are noticed without backtracking over the rest of
+    the input.
+    """
+    for parse in (parser.parse_string,
+            lambda text: list(parser.iter_string(text))):
+        start = time.time()
+        with pytest.raises(pyparsing.ParseException):
+            parse(text)
+        assert time.time() - start < 1
+
+
+@stress
+@pytest.mark.parametrize('make_input', [entries,
+    lambda size: nested(size * 10), lambda size: large_field(size * 1000),
+    lambda size: large_field(size * 1000, quote=True)])
+def test_linear_scaling(make_input):
+    """
+    Parse times grow linearly with the size of the input.
+    """
+    ratio = scaling(parser.parse_string, make_input, 50 * SCALE)
+    assert ratio < 4 * 2.5
+
+
+@stress
+@pytest.mark.skipif(tracemalloc is None, reason='requires tracemalloc')
+def test_streaming_memory(monkeypatch):
+    """
+    The memory used for streaming entries doesn't depend on the number of
+    entries.
+    """
+    monkeypatch.setattr(parser, 'CHUNK_SIZE', 4096)
+    list(parser.iter_string(entries(1)))
+
+    def peak(count):
+        source = io.StringIO(entries(count))
+        tracemalloc.start()
+        try:
+            for entry in parser.iter_file(source):
+                pass
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    # Recorded warnings would count as used memory as well.
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        assert peak(800 * SCALE) < 1.5 * peak(200 * SCALE)
+
+
+def mutate(text, rng):
+    """
+    Randomly deletes, duplicates or inserts characters that are significant
+    to the grammar.
+    """
+    chars = list(text)
+    for _ in range(rng.randint(1, 10)):
+        pos = rng.randrange(len(chars))
+        action = rng.randrange(3)
+        if action == 0:
+            del chars[pos]
+        elif action == 1:
+            chars.insert(pos, chars[pos] * rng.randint(1, 200))
+        else:
+            chars.insert(pos, rng.choice('{}"\'@%,=\\\n') * rng.randint(1, 50))
+    return ''.join(chars)
+
+
+def test_fuzz():
+    """
+    Randomly broken input either parses or fails with one of the expected
+    exceptions, both with and without limits.
+    """
+    rng = random.Random(4711)
+    base = entries(3) + nested(20)
+    limits = parser.Limits(max_depth=16, max_field_size=500,
+            max_entry_size=2000)
+    for _ in range(200 * STRESS_SCALE or 50):
+        text = mutate(base, rng)
+        for kwargs in ({}, {'limits': limits}):
+            try:
+                parser.parse_string(text, **kwargs)
+            except EXPECTED_ERRORS:
+                pass
+            try:
+                list(parser.iter_string(text, **kwargs))
+            except EXPECTED_ERRORS:
+                pass
@@ -0,0 +1,179 @@
+import pickle
+import threading
+
+import pytest
+
+from zs.bibtex import structures, exceptions, versioned
+from .helpers import parse_bibliography
+
+
+INPUT = '''@article{mm09, author={Max Mustermann}, title={Hello world},
+    journal={My Journal}, year={2009}}
+@book{book, editor={Max Mustermann}, title={A book}, publisher={P},
+    year=2010}
+'''
+
+
+def make_entry(name, title='Title'):
+    entry = structures.Misc(name)
+    entry['title'] = title
+    return entry
+
+
+def test_snapshot_isolation():
+    """
+    Snapshots don't see changes published after they were taken.
+    """
+    bib = versioned.VersionedBibliography(parse_bibliography(INPUT))
+    snapshot = bib.snapshot()
+    bib.add(make_entry('new'))
+    bib.remove('book')
+    assert set(['mm09', 'book']) == set(snapshot)
+    assert 2 == len(snapshot)
+    assert set(['mm09', 'new']) == set(bib)
+    assert 2 == len(bib)
+    assert 'book' not in bib
+    with pytest.raises(KeyError):
+        bib['book']
+    assert snapshot.number + 2 == bib.snapshot().number
+
+
+def test_structural_sharing():
+    """
+    Unchanged entries are shared between versions, even after the changes
+    were merged into a new base.
+    """
+    bib = versioned.VersionedBibliography(parse_bibliography(INPUT))
+    entry = bib['mm09']
+    for i in range(versioned.MIN_DELTA_SIZE * 2):
+        bib.add(make_entry('entry%d' % i))
+    assert entry is bib['mm09']
+    assert versioned.MIN_DELTA_SIZE * 2 + 2 == len(bib)
+    assert len(bib) == len(list(bib))
+
+
+def test_transaction():
+    """
+    A transaction's changes are only published once it completes
+    successfully.
+    """
+    bib = versioned.VersionedBibliography(parse_bibliography(INPUT))
+    with bib.transaction() as txn:
+        txn.add(make_entry('new'))
+        txn.remove('book')
+        assert 'new' in txn and 'book' not in txn
+        assert 'new' not in bib
+    assert 'new' in bib
+    with pytest.raises(RuntimeError):
+        with bib.transaction() as txn:
+            txn.remove('mm09')
+            raise RuntimeError()
+    assert 'mm09' in bib
+
+
+def test_frozen_entries():
+    bib = versioned.VersionedBibliography(parse_bibliography(INPUT))
+    entry = bib['mm09']
+    assert isinstance(entry, structures.Article)
+    with pytest.raises(TypeError):
+        entry['title'] = 'Changed'
+    with pytest.raises(TypeError):
+        entry.update(title='Changed')
+    with pytest.raises(TypeError):
+        entry.name = 'changed'
+    copy = versioned.thaw_entry(entry)
+    copy['title'] = 'Changed'
+    assert structures.Article == type(copy)
+    assert 'Hello world' == entry['title']
+    entry.validate()
+
+    restored = pickle.loads(pickle.dumps(entry))
+    assert restored == entry
+    assert restored.name == 'mm09'
+    assert type(restored) == type(entry)
+
+
+def test_entries_are_copied():
+    """
+    Adding entries doesn't freeze the caller's instances.
+    """
+    original = parse_bibliography(INPUT)
+    bib = versioned.VersionedBibliography(original)
+    original['mm09']['title'] = 'Changed'
+    assert 'Hello world' == bib['mm09']['title']
+
+    entry = make_entry('new')
+    with bib.transaction() as txn:
+        txn.add(entry)
+    snapshot = bib.snapshot()
+    entry['title'] = 'Changed'
+    assert 'Title' == snapshot['new']['title']
+    bib.add(entry)
+    assert 'Changed' == bib['new']['title']
+    assert 'Title' == snapshot['new']['title']
+
+    frozen = bib['new']
+    bib.add(frozen)
+    assert frozen is bib['new']
+
+
+def test_lists_are_copied():
+    """
+    Changing the author list of an added entry in place doesn't change the
+    published versions, and neither does changing the one of a thawed copy.
+    """
+    original = parse_bibliography('''@article{mm09,
+    author={Max Mustermann and Erika Mustermann}, title={Hello world},
+    journal={My Journal}, year={2009}}''')
+    authors = ['Max Mustermann', 'Erika Mustermann']
+    bib = versioned.VersionedBibliography(original)
+    snapshot = bib.snapshot()
+    content_hash = snapshot['mm09'].content_hash()
+    original['mm09']['author'].append('John Doe')
+    assert authors == snapshot['mm09']['author']
+    assert content_hash == snapshot['mm09'].content_hash()
+
+    copy = versioned.thaw_entry(snapshot['mm09'])
+    copy['author'].append('John Doe')
+    assert authors == snapshot['mm09']['author']
+
+
+def test_validate():
+    bib = versioned.VersionedBibliography(parse_bibliography(INPUT))
+    bib.validate()
+    entry = make_entry('ref')
+    entry['crossref'] = 'missing'
+    bib.add(entry)
+    with pytest.raises(exceptions.BrokenCrossReferences):
+        bib.validate()
+
+
+def test_concurrent_readers():
+    """
+    Readers always see a consistent version while a writer publishes new
+    ones.
+    """
+    bib = versioned.VersionedBibliography()
+    errors = []
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            snapshot = bib.snapshot()
+            names = list(snapshot)
+            if len(names) != len(snapshot) or \
+                    len(names) != snapshot.number * 2:
+                errors.append(snapshot)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for i in range(200):
+        with bib.transaction() as txn:
+            txn.add(make_entry('a%d' % i))
+            txn.add(make_entry('b%d' % i))
+    done.set()
+    for reader in readers:
+        reader.join()
+    assert [] == errors
+    assert 400 == len(bib)